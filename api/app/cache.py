@@ -0,0 +1,230 @@
+"""
+Result cache backends shared across worker processes.
+
+``memory`` is the per-process ``TTLCache``. ``sqlite`` keeps entries in a
+WAL-mode SQLite file that every worker on the host opens, so hits are
+shared and survive restarts. ``redis`` (optional ``redis`` package) shares
+them across hosts; size it with Redis' own ``maxmemory`` + LRU policy.
+
+All backends take the key tuples the endpoints build, pickle values, and
+count hits/misses for /stats; ``get(key, count_miss=False)`` leaves a miss
+uncounted when a counted lookup of another key follows it. Lookup errors in shared backends are counted
+and treated as misses so a cache outage never fails a request.
+"""
+import heapq
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .guardrails import TTLCache
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _key(key: Tuple[Any, ...]) -> str:
+    return json.dumps(list(key), default=str, separators=(",", ":"))
+
+
+class _Counters:
+    backend = ""
+
+    def __init__(self):
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _count(self, field: str) -> int:
+        with self._counter_lock:
+            value = getattr(self, field) + 1
+            setattr(self, field, value)
+            return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counter_lock:
+            hits, misses, errors = self.hits, self.misses, self.errors
+        lookups = hits + misses
+        return {
+            "backend": self.backend,
+            "hits": hits,
+            "misses": misses,
+            "errors": errors,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+        }
+
+
+class SQLiteCache(_Counters):
+    backend = "sqlite"
+    evict_every = 64
+
+    def __init__(self, path: str, ttl_seconds: int = 6 * 3600, max_items: int = 5000):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl_seconds
+        self.max_items = max_items
+        self._local = threading.local()
+        self._sets = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS result_cache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS result_cache_expires ON result_cache (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: Tuple[Any, ...], count_miss: bool = True) -> Optional[Any]:
+        try:
+            row = self._conn().execute(
+                "SELECT value FROM result_cache WHERE key = ? AND expires_at > ?", (_key(key), time.time())
+            ).fetchone()
+        except sqlite3.Error:
+            logger.warning("SQLite cache read failed", exc_info=True)
+            self._count("errors")
+            row = None
+        if row is None:
+            if count_miss:
+                self._count("misses")
+            return None
+        self._count("hits")
+        return pickle.loads(row[0])
+
+    def set(self, key: Tuple[Any, ...], value: Any) -> None:
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO result_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (_key(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), time.time() + self.ttl),
+            )
+            if self._count("_sets") % self.evict_every == 0:
+                self._evict(conn)
+        except sqlite3.Error:
+            logger.warning("SQLite cache write failed", exc_info=True)
+            self._count("errors")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop expired rows, then the soonest-expiring ones beyond ``max_items``."""
+        conn.execute("DELETE FROM result_cache WHERE expires_at <= ?", (time.time(),))
+        excess = conn.execute("SELECT COUNT(*) FROM result_cache").fetchone()[0] - self.max_items
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM result_cache WHERE key IN"
+                " (SELECT key FROM result_cache ORDER BY expires_at LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM result_cache")
+
+    def purge(self, predicate: Callable[[Tuple[Any, ...]], bool]) -> int:
+        conn = self._conn()
+        doomed = [(k,) for (k,) in conn.execute("SELECT key FROM result_cache") if predicate(tuple(json.loads(k)))]
+        conn.executemany("DELETE FROM result_cache WHERE key = ?", doomed)
+        return len(doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        out = super().stats()
+        try:
+            out["items"] = self._conn().execute("SELECT COUNT(*) FROM result_cache").fetchone()[0]
+        except sqlite3.Error:
+            out["items"] = None
+        return out
+
+
+class RedisCache(_Counters):
+    backend = "redis"
+
+    def __init__(self, url: str, ttl_seconds: int = 6 * 3600, prefix: str = "closest-tornado:"):
+        super().__init__()
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from exc
+        self._redis_error = redis.RedisError
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.ttl = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key: Tuple[Any, ...], count_miss: bool = True) -> Optional[Any]:
+        try:
+            raw = self._client.get(self.prefix + _key(key))
+        except self._redis_error:
+            logger.warning("Redis cache read failed", exc_info=True)
+            self._count("errors")
+            raw = None
+        if raw is None:
+            if count_miss:
+                self._count("misses")
+            return None
+        self._count("hits")
+        return pickle.loads(raw)
+
+    def set(self, key: Tuple[Any, ...], value: Any) -> None:
+        try:
+            self._client.set(self.prefix + _key(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=self.ttl)
+        except self._redis_error:
+            logger.warning("Redis cache write failed", exc_info=True)
+            self._count("errors")
+
+    def clear(self) -> None:
+        self.purge(lambda key: True)
+
+    def purge(self, predicate: Callable[[Tuple[Any, ...]], bool]) -> int:
+        purged = 0
+        for name in self._client.scan_iter(match=self.prefix + "*", count=1000):
+            if predicate(tuple(json.loads(name[len(self.prefix):]))):
+                self._client.delete(name)
+                purged += 1
+        return purged
+
+
+class HotKeys:
+    """
+    Request counts per cache key (minus the dataset version), with the
+    arguments needed to rebuild each response, so the most requested
+    entries can be re-warmed after a refresh.
+    """
+    def __init__(self, max_tracked: int = 5000):
+        self.max_tracked = max_tracked
+        self._lock = threading.Lock()
+        self._counts: Dict[Tuple[Any, ...], int] = {}
+        self._args: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+
+    def record(self, key: Tuple[Any, ...], build_args: Dict[str, Any]) -> None:
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+            self._args[key] = build_args
+            if len(self._counts) > self.max_tracked:
+                keep = dict(heapq.nlargest(self.max_tracked // 2, self._counts.items(), key=lambda kv: kv[1]))
+                self._args = {k: self._args[k] for k in keep}
+                self._counts = keep
+
+    def top(self, n: int) -> List[Tuple[Tuple[Any, ...], Dict[str, Any]]]:
+        with self._lock:
+            hottest = heapq.nlargest(n, self._counts.items(), key=lambda kv: kv[1])
+            return [(key, self._args[key]) for key, _ in hottest]
+
+
+def make_result_cache():
+    """The backend selected by ``settings.cache_backend``."""
+    if settings.cache_backend == "sqlite":
+        return SQLiteCache(settings.cache_sqlite_path, settings.cache_ttl_seconds, settings.cache_max_items)
+    if settings.cache_backend == "redis":
+        if not settings.cache_redis_url:
+            raise RuntimeError("CACHE_BACKEND=redis requires CACHE_REDIS_URL")
+        return RedisCache(settings.cache_redis_url, settings.cache_ttl_seconds)
+    return TTLCache(ttl_seconds=settings.cache_ttl_seconds, max_items=settings.cache_max_items, max_bytes=settings.cache_max_mb * 1024 * 1024)
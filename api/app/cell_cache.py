@@ -0,0 +1,149 @@
+"""
+Grid-cell candidate cache for the PostGIS query engine.
+
+The first lookup in a lat/lon cell fetches every track that could be in the
+top ``CELL_K`` for *any* point of that cell and keeps them as a small
+``TrackIndex``; later lookups in the cell are answered in-process.
+
+Why the set is sufficient: let ``p`` be the point that filled the cell,
+``D`` the cell diameter and ``d_k`` the largest centerline distance from
+``p`` among any ``CELL_K`` tracks (the KNN ones). For a point ``q`` in the
+cell, those tracks are within ``d_k + D`` of ``q``, so ``q``'s k-th result is
+too. A track in ``q``'s top k is then within ``d_k + D`` of ``q`` at its
+edge, so its centerline is within ``d_k + 2D + max_half_width`` of ``p``.
+A small slack covers the sphere (refinement) vs spheroid (PostGIS) gap.
+
+That radius has no bound of its own: it grows with ``d_k`` in sparse or
+offshore cells, and with fewer than ``CELL_K`` tracks in the year window
+there is none. A fill beyond ``max_radius_m`` or ``max_rows`` returns no
+rows (at most ``max_rows + 1``); the cell then caches ``UNCACHEABLE`` so
+its lookups go straight to ``NEAREST_SQL`` until the entry expires.
+"""
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from .guardrails import TTLCache
+from .track_index import EARTH_RADIUS_M, TrackIndex
+
+# Cells are filled for the largest top_n, so every request size is served.
+CELL_K = 15
+RADIUS_SLACK = 1.01
+RADIUS_SLACK_M = 10.0
+# Cached for a cell whose fill hit a cap; falsy, unlike a TrackIndex.
+UNCACHEABLE = False
+
+CELL_SQL = text("""
+WITH p AS (
+  SELECT ST_SetSRID(ST_Point(:lon, :lat), 4326)::geography AS geog
+),
+nearest AS (
+  SELECT ST_Distance(p.geog, t.geog_line) AS d
+  FROM p
+  CROSS JOIN LATERAL (
+    SELECT t.geog_line
+    FROM tornado_event t
+    WHERE t.begin_year BETWEEN CAST(:start_year AS integer) AND CAST(:end_year AS integer)
+    ORDER BY t.geog_line <-> p.geog
+    LIMIT :k
+  ) t
+),
+bound AS (
+  SELECT
+    CASE
+      -- Fewer than k tracks in the window: no finite radius, so no fill.
+      WHEN COUNT(*) < :k THEN NULL
+      ELSE (
+        MAX(d)
+        + (SELECT COALESCE(MAX(tor_width_yards), 0) * 0.9144 / 2.0 FROM tornado_event)
+        + :pad_m
+      ) * :slack + :slack_m
+    END AS radius_m
+  FROM nearest
+)
+SELECT
+  t.event_id, t.begin_dt, t.end_dt, t.state, t.cz_name, t.wfo,
+  t.tor_f_scale, t.tor_length_miles, t.tor_width_yards,
+  ST_Y(ST_StartPoint(t.geom_line)) AS lat0,
+  ST_X(ST_StartPoint(t.geom_line)) AS lon0,
+  ST_Y(ST_EndPoint(t.geom_line)) AS lat1,
+  ST_X(ST_EndPoint(t.geom_line)) AS lon1
+FROM p
+CROSS JOIN bound b
+JOIN tornado_event t
+  ON ST_DWithin(t.geog_line, p.geog, b.radius_m)
+WHERE t.begin_year BETWEEN CAST(:start_year AS integer) AND CAST(:end_year AS integer)
+  AND t.geom_line IS NOT NULL
+  AND b.radius_m <= :max_radius_m
+LIMIT :max_rows + 1;
+""")
+
+
+def _haversine_m(lat0: float, lon0: float, lat1: float, lon1: float) -> float:
+    phi0, phi1 = math.radians(lat0), math.radians(lat1)
+    h = math.sin((phi1 - phi0) / 2) ** 2 + math.cos(phi0) * math.cos(phi1) * math.sin(math.radians(lon1 - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(h)))
+
+
+class CellCache:
+    """Per-process cache of cell candidate sets, keyed by dataset version."""
+    def __init__(
+        self,
+        cell_deg: float = 0.02,
+        ttl_seconds: int = 6 * 3600,
+        max_bytes: int = 128 * 1024 * 1024,
+        max_radius_m: float = 100_000.0,
+        max_rows: int = 5000,
+    ):
+        self.cell_deg = cell_deg
+        self.max_radius_m = max_radius_m
+        self.max_rows = max_rows
+        self.cells = TTLCache(ttl_seconds=ttl_seconds, max_items=1_000_000, max_bytes=max_bytes)
+        self.uncacheable = 0
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def key(self, dataset_version, lat: float, lon: float, start_year: int, end_year: int) -> Tuple[Any, ...]:
+        return ("cell", dataset_version, *self._cell(lat, lon), start_year, end_year)
+
+    def diameter_m(self, lat: float, lon: float) -> float:
+        """Longest distance between two points of the cell holding ``(lat, lon)`` (its diagonal)."""
+        i, j = self._cell(lat, lon)
+        g = self.cell_deg
+        return _haversine_m(i * g, j * g, (i + 1) * g, (j + 1) * g)
+
+    def params(self, lat: float, lon: float, start_year: int, end_year: int) -> Dict[str, Any]:
+        return {
+            "lat": lat,
+            "lon": lon,
+            "k": CELL_K,
+            "start_year": start_year,
+            "end_year": end_year,
+            "pad_m": 2.0 * self.diameter_m(lat, lon),
+            "slack": RADIUS_SLACK,
+            "slack_m": RADIUS_SLACK_M,
+            "max_radius_m": self.max_radius_m,
+            "max_rows": self.max_rows,
+        }
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[Any]:
+        """The cell's ``TrackIndex``, ``UNCACHEABLE``, or None when it has not been filled."""
+        return self.cells.get(key)
+
+    def store(self, key: Tuple[Any, ...], rows: List[Dict[str, Any]]) -> Any:
+        """Cache a fill, or ``UNCACHEABLE`` when ``CELL_SQL`` hit a cap (no rows, or ``max_rows + 1``)."""
+        if not rows or len(rows) > self.max_rows:
+            self.uncacheable += 1
+            self.cells.set(key, UNCACHEABLE, size=64)
+            return UNCACHEABLE
+        index = TrackIndex([dict(r) for r in rows], grid_deg=self.cell_deg)
+        self.cells.set(key, index, size=index.nbytes)
+        return index
+
+    def purge(self, predicate: Callable[[Tuple[Any, ...]], bool]) -> int:
+        return self.cells.purge(predicate)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"cell_deg": self.cell_deg, "uncacheable_fills": self.uncacheable, **self.cells.stats()}
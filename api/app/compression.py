@@ -0,0 +1,86 @@
+"""
+Response compression.
+
+Bodies are compressed once and the result is kept: cached closest-tornado
+responses store one extra cache entry per content coding next to the
+identity body, and the static page is compressed at import. Brotli is used
+when the ``brotli`` package is installed, otherwise only gzip is offered.
+"""
+import gzip
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+from .settings import settings
+
+# Server preference when the client weights codings equally.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _weights(accept_encoding: str) -> Dict[str, float]:
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+    return weights
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick a content coding from an ``Accept-Encoding`` header, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights = _weights(accept_encoding)
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    """``best`` trades CPU for size, for bodies compressed once up front."""
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if best else settings.compression_brotli_quality)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9 if best else settings.compression_gzip_level, mtime=0)
+    raise ValueError(f"unsupported content coding: {encoding}")
+
+
+def should_compress(body: bytes) -> bool:
+    return len(body) >= settings.compression_min_bytes
+
+
+def encoded_headers(headers: Optional[Dict[str, str]], encoding: Optional[str]) -> Dict[str, str]:
+    out = {**(headers or {}), "Vary": "Accept-Encoding"}
+    if encoding is not None:
+        out["Content-Encoding"] = encoding
+    return out
+
+
+class PrecompressedBody:
+    """A fixed body with every supported coding computed once."""
+    def __init__(self, body: bytes):
+        self.body = body
+        self.encoded = {encoding: compress(body, encoding, best=True) for encoding in ENCODINGS}
+
+    def select(self, accept_encoding: Optional[str]):
+        """Return ``(content, headers)`` for a request's ``Accept-Encoding``."""
+        encoding = negotiate(accept_encoding)
+        if encoding is None:
+            return self.body, encoded_headers(None, None)
+        return self.encoded[encoding], encoded_headers(None, encoding)
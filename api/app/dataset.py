@@ -0,0 +1,117 @@
+"""
+Dataset revision tracking and the cached /meta payload.
+
+``dataset_refresh_meta`` is a single row that imports keep current (see
+``refresh_dataset_stats`` in import_noaa_year.py). Workers poll its
+``(dataset_version, updated_at)`` pair at most once per ``poll_seconds`` and
+rebuild the /meta payload only when that pair changes.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+VERSION_SQL = text("""
+SELECT dataset_version, updated_at
+FROM dataset_refresh_meta
+WHERE id = 1;
+""")
+
+META_SQL = text("""
+SELECT
+  data_last_refreshed,
+  dataset_version,
+  updated_at,
+  tornado_event_count,
+  min_begin_dt,
+  max_begin_dt,
+  year_counts,
+  state_counts
+FROM dataset_refresh_meta
+WHERE id = 1;
+""")
+
+EMPTY_META: Dict[str, Any] = {
+    "data_last_refreshed": None,
+    "dataset_version": None,
+    "metadata_updated_at": None,
+    "tornado_event_count": 0,
+    "earliest_event_begin_dt": None,
+    "latest_event_begin_dt": None,
+    "event_counts_by_year": {},
+    "event_counts_by_state": {},
+}
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def meta_payload(row) -> Dict[str, Any]:
+    if not row:
+        return dict(EMPTY_META)
+    return {
+        "data_last_refreshed": _iso(row.get("data_last_refreshed")),
+        "dataset_version": row.get("dataset_version"),
+        "metadata_updated_at": _iso(row.get("updated_at")),
+        "tornado_event_count": int(row.get("tornado_event_count") or 0),
+        "earliest_event_begin_dt": _iso(row.get("min_begin_dt")),
+        "latest_event_begin_dt": _iso(row.get("max_begin_dt")),
+        "event_counts_by_year": {str(k): int(v) for k, v in sorted((row.get("year_counts") or {}).items())},
+        "event_counts_by_state": {str(k): int(v) for k, v in sorted((row.get("state_counts") or {}).items())},
+    }
+
+
+class DatasetState:
+    """
+    ``read(fn)`` runs ``fn(conn)`` on a read connection (main._read).
+    ``on_change(old_version, new_version)`` is called from the polling
+    thread when a poll sees a different ``dataset_version``.
+    """
+    def __init__(self, read: Callable, poll_seconds: float = 15.0, on_change: Optional[Callable[[Any, Any], None]] = None):
+        self._read = read
+        self.poll_seconds = poll_seconds
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._key: Optional[Tuple[Any, Any]] = None
+        self._polled_at = float("-inf")
+        self._meta: Optional[Dict[str, Any]] = None
+        self._meta_key: Optional[Tuple[Any, Any]] = None
+
+    def revision(self) -> Tuple[Any, Any]:
+        """``(dataset_version, updated_at)``, re-read at most every ``poll_seconds``."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._polled_at < self.poll_seconds:
+                return self._key
+        row = self._read(lambda conn: conn.execute(VERSION_SQL).mappings().first())
+        key = (row.get("dataset_version"), row.get("updated_at")) if row else (None, None)
+        with self._lock:
+            previous = self._key
+            self._key = key
+            self._polled_at = now
+        if self.on_change is not None and previous is not None and previous[0] != key[0]:
+            self.on_change(previous[0], key[0])
+        return key
+
+    def version(self) -> Optional[str]:
+        return self.revision()[0]
+
+    def meta(self) -> Dict[str, Any]:
+        key = self.revision()
+        with self._lock:
+            if self._meta is not None and self._meta_key == key:
+                return self._meta
+        row = self._read(lambda conn: conn.execute(META_SQL).mappings().first())
+        payload = meta_payload(row)
+        with self._lock:
+            self._meta = payload
+            self._meta_key = key
+        return payload
+
+    def invalidate(self) -> None:
+        """Re-read the revision on next use (after an in-process refresh)."""
+        with self._lock:
+            self._polled_at = float("-inf")
+            self._meta = None
@@ -1,10 +1,187 @@
+import functools
+import itertools
+import logging
+import threading
 import time
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+from typing import Callable
+
+import anyio
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.exc import OperationalError
 from .settings import settings
 
-engine: Engine = create_engine(settings.database_url, pool_pre_ping=True)
+logger = logging.getLogger(__name__)
+
+
+# Execution option marking a statement for server-side preparing, e.g.
+# ``text(...).execution_options(**{PREPARE_OPTION: True})``.
+PREPARE_OPTION = "server_side_prepare"
+
+
+def _connect_args(url: str) -> dict:
+    """
+    psycopg turns a statement into a server-side prepared statement once it
+    has run ``prepare_threshold`` times on a connection. The default (None)
+    prepares nothing on its own; statements carrying ``PREPARE_OPTION``, the
+    hot nearest-tornado query, are prepared on first use instead, so they are
+    planned once per pooled connection. ``plan_cache_mode`` decides whether
+    Postgres then reuses a generic plan.
+    """
+    if make_url(url).get_driver_name() != "psycopg":
+        return {}
+    return {
+        "prepare_threshold": settings.db_prepare_threshold,
+        "options": f"-c plan_cache_mode={settings.db_plan_cache_mode}",
+    }
+
+
+def _execute_prepared(cursor, statement, parameters, context):
+    """``do_execute`` hook: psycopg ``prepare=True`` for statements marked with ``PREPARE_OPTION``."""
+    if context is not None and context.execution_options.get(PREPARE_OPTION):
+        cursor.execute(statement, parameters, prepare=True)
+        return True
+    return None
+
+
+def _create_engine(url: str, connect_args: dict) -> Engine:
+    created = create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        connect_args=connect_args,
+    )
+    if make_url(url).get_driver_name() == "psycopg":
+        event.listen(created, "do_execute", _execute_prepared)
+    return created
+
+
+engine: Engine = _create_engine(settings.database_url, _connect_args(settings.database_url))
+
+
+
+class ReplicaRouter:
+    """
+    Round-robin over healthy read replicas, falling back to the primary.
+
+    Each replica is probed with ``SELECT 1`` at most once per
+    ``retry_seconds``; one that fails the probe (or a query, via
+    ``mark_down``) is skipped until its next probe succeeds. Probes run on a
+    background thread, so a request never waits on an unreachable replica's
+    connect timeout: it routes on the last known state while the probe runs.
+    """
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: list[Engine],
+        retry_seconds: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.retry_seconds = retry_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._order = itertools.cycle(range(len(replicas))) if replicas else None
+        self._healthy = [True] * len(replicas)
+        self._checked_at = [float("-inf")] * len(replicas)
+        self._probing = [False] * len(replicas)
+
+    def _probe(self, replica: Engine) -> bool:
+        try:
+            with replica.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            logger.warning("Read replica %s failed its health check", replica.url.render_as_string(hide_password=True))
+            return False
+
+    def _spawn(self, fn: Callable[[], None]) -> None:
+        threading.Thread(target=fn, name="replica-probe", daemon=True).start()
+
+    def _run_probe(self, i: int) -> None:
+        try:
+            healthy = self._probe(self.replicas[i])
+            with self._lock:
+                self._healthy[i] = healthy
+                self._checked_at[i] = self._clock()
+        finally:
+            with self._lock:
+                self._probing[i] = False
+
+    def _is_healthy(self, i: int) -> bool:
+        with self._lock:
+            due = self._clock() - self._checked_at[i] >= self.retry_seconds
+            if due and not self._probing[i]:
+                self._probing[i] = True
+            else:
+                due = False
+        if due:
+            self._spawn(functools.partial(self._run_probe, i))
+        with self._lock:
+            return self._healthy[i]
+
+    def replica(self) -> Engine | None:
+        """Next healthy replica, or None when there is none."""
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                i = next(self._order)
+            if self._is_healthy(i):
+                return self.replicas[i]
+        return None
+
+    def engine(self) -> Engine:
+        return self.replica() or self.primary
+
+    def status(self) -> list[dict]:
+        with self._lock:
+            return [
+                {"url": replica.url.render_as_string(hide_password=True), "healthy": healthy}
+                for replica, healthy in zip(self.replicas, self._healthy)
+            ]
+
+    def mark_down(self, replica: Engine) -> None:
+        for i, candidate in enumerate(self.replicas):
+            if candidate is replica:
+                with self._lock:
+                    self._healthy[i] = False
+                    self._checked_at[i] = self._clock()
+
+
+def _replica_engine(url: str) -> Engine:
+    connect_args = _connect_args(url)
+    if connect_args:
+        connect_args["connect_timeout"] = settings.replica_connect_timeout_seconds
+    return _create_engine(url, connect_args)
+
+
+replica_router = ReplicaRouter(
+    engine,
+    [_replica_engine(url.strip()) for url in settings.database_replica_urls.split(",") if url.strip()],
+    retry_seconds=settings.replica_retry_seconds,
+)
+
+
+def read_engine() -> Engine:
+    """Engine for read-only queries: a healthy replica, else the primary."""
+    return replica_router.engine()
+
+
+# Async endpoints hand blocking queries to worker threads, at most one per
+# pooled connection, so the event loop never waits on PostGIS and threads
+# never pile up waiting for a connection.
+db_limiter = anyio.CapacityLimiter(settings.db_pool_size + settings.db_max_overflow)
+
+# Streaming responses hold a db_limiter token (and a connection) for as long
+# as the client takes to read; this caps how many may do so at once.
+stream_limiter = anyio.CapacityLimiter(max(1, min(settings.stream_max_concurrent, settings.db_pool_size + settings.db_max_overflow - 1)))
+
+
+async def run_db(fn, *args, **kwargs):
+    """Run a blocking database call off the event loop."""
+    return await anyio.to_thread.run_sync(functools.partial(fn, *args, **kwargs), limiter=db_limiter)
+
 
 def wait_for_db(max_seconds: int = 60) -> None:
     """
@@ -25,5 +202,15 @@ def wait_for_db(max_seconds: int = 60) -> None:
 def run_migrations() -> None:
     wait_for_db()
     with engine.begin() as conn:
-        sql = open("/app/sql/001_init.sql", "r", encoding="utf-8").read()
-        conn.execute(text(sql))
\ No newline at end of file
+        # The migration is many statements in one string, which Postgres
+        # refuses to prepare; never let a db_prepare_threshold apply to it.
+        driver_conn = conn.connection.driver_connection
+        threshold = getattr(driver_conn, "prepare_threshold", None)
+        if threshold is not None:
+            driver_conn.prepare_threshold = None
+        try:
+            sql = open("/app/sql/001_init.sql", "r", encoding="utf-8").read()
+            conn.execute(text(sql))
+        finally:
+            if threshold is not None:
+                driver_conn.prepare_threshold = threshold
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Tornado touchdown density for heatmaps.
+
+``density_cell`` holds begin-point counts per grid cell, year and F/EF
+rating; imports keep it current for the years they touch (see
+``refresh_dataset_stats`` in import_noaa_year.py). A window request sums
+the matching rows of that table only, never ``tornado_event``, and returns
+the window as one dense row-major array of counts.
+"""
+import math
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+# Grid resolution. import_noaa_year.py bins density_cell rows with it, so a
+# change needs the table rebuilt.
+DENSITY_CELLS_PER_DEGREE = 10
+CELL_DEG = 1.0 / DENSITY_CELLS_PER_DEGREE
+
+DENSITY_WINDOW_SQL = text("""
+SELECT cell_lat, cell_lon, SUM(event_count) AS event_count
+FROM density_cell
+WHERE cell_lat BETWEEN :lat_from AND :lat_to
+  AND cell_lon BETWEEN :lon_from AND :lon_to
+  AND year BETWEEN :start_year AND :end_year
+  AND (CAST(:ratings AS smallint[]) IS NULL OR f_rating = ANY(CAST(:ratings AS smallint[])))
+GROUP BY cell_lat, cell_lon;
+""")
+
+# Cell index range, inclusive: (lat_from, lat_to, lon_from, lon_to).
+Window = Tuple[int, int, int, int]
+
+
+def cell_window(south: float, west: float, north: float, east: float) -> Window:
+    """Indexes of every cell that overlaps the box."""
+    lat_from = math.floor(south * DENSITY_CELLS_PER_DEGREE)
+    lon_from = math.floor(west * DENSITY_CELLS_PER_DEGREE)
+    lat_to = max(lat_from, math.ceil(north * DENSITY_CELLS_PER_DEGREE) - 1)
+    lon_to = max(lon_from, math.ceil(east * DENSITY_CELLS_PER_DEGREE) - 1)
+    return lat_from, lat_to, lon_from, lon_to
+
+
+def window_shape(window: Window) -> Tuple[int, int]:
+    lat_from, lat_to, lon_from, lon_to = window
+    return lat_to - lat_from + 1, lon_to - lon_from + 1
+
+
+def window_params(window: Window, start_year: int, end_year: int, ratings: Optional[Tuple[int, ...]]) -> Dict[str, Any]:
+    lat_from, lat_to, lon_from, lon_to = window
+    return {
+        "lat_from": lat_from,
+        "lat_to": lat_to,
+        "lon_from": lon_from,
+        "lon_to": lon_to,
+        "start_year": start_year,
+        "end_year": end_year,
+        "ratings": list(ratings) if ratings else None,
+    }
+
+
+def density_payload(rows: Iterable[Dict[str, Any]], window: Window) -> Dict[str, Any]:
+    """
+    ``counts`` is row-major from the south-west cell: row ``i`` is latitude
+    ``origin[0] + i * cell_deg``, column ``j`` longitude ``origin[1] + j * cell_deg``.
+    """
+    lat_from, _, lon_from, _ = window
+    rows_n, cols_n = window_shape(window)
+    grid = np.zeros((rows_n, cols_n), dtype=np.int32)
+    for row in rows:
+        grid[int(row["cell_lat"]) - lat_from, int(row["cell_lon"]) - lon_from] = int(row["event_count"])
+    return {
+        "cell_deg": CELL_DEG,
+        "origin": [round(lat_from * CELL_DEG, 6), round(lon_from * CELL_DEG, 6)],
+        "shape": [rows_n, cols_n],
+        "total": int(grid.sum()),
+        "max": int(grid.max()) if grid.size else 0,
+        "counts": grid.ravel(),
+    }
@@ -0,0 +1,173 @@
+"""
+Compact geometry output.
+
+Track, closest-point and corridor geometry leave the query layer as full
+precision GeoJSON strings (PostGIS, the materialized columns, the in-process
+engine and the cell cache all agree on that shape). The helpers here trim
+that for the wire: coordinate rounding, a coarser regenerated corridor,
+Douglas-Peucker simplification, and Google encoded polylines.
+"""
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+from .track_index import EARTH_RADIUS_M, corridor_polygon
+
+POLYLINE_PRECISION = 5
+# Decoders working in 32-bit integers (JavaScript bit ops, most map SDKs)
+# overflow on longitude deltas past this precision.
+MAX_POLYLINE_PRECISION = 6
+
+
+def round_coords(coords: Any, precision: int) -> Any:
+    """Round every number in a (nested) GeoJSON coordinate array."""
+    if coords and isinstance(coords[0], (int, float)):
+        return [round(float(c), precision) for c in coords]
+    return [round_coords(c, precision) for c in coords]
+
+
+def simplify_line(points: Sequence[Sequence[float]], tolerance_m: float) -> List[List[float]]:
+    """
+    Douglas-Peucker on ``[lon, lat]`` points, with distances measured in a
+    local equirectangular frame so the tolerance is in metres. End points are
+    always kept, so a closed ring stays closed.
+    """
+    points = [list(p) for p in points]
+    if tolerance_m <= 0 or len(points) <= 2:
+        return points
+
+    lat_ref = math.radians(sum(p[1] for p in points) / len(points))
+    kx = math.cos(lat_ref) * math.pi / 180.0 * EARTH_RADIUS_M
+    ky = math.pi / 180.0 * EARTH_RADIUS_M
+    xy = [(p[0] * kx, p[1] * ky) for p in points]
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xy[first]
+        bx, by = xy[last]
+        dx, dy = bx - ax, by - ay
+        seg_len2 = dx * dx + dy * dy
+        worst, worst_d = None, tolerance_m
+        for i in range(first + 1, last):
+            px, py = xy[i]
+            if seg_len2 == 0.0:
+                d = math.hypot(px - ax, py - ay)
+            else:
+                t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / seg_len2))
+                d = math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+            if d > worst_d:
+                worst, worst_d = i, d
+        if worst is not None:
+            keep[worst] = True
+            stack.append((first, worst))
+            stack.append((worst, last))
+
+    out = [p for p, k in zip(points, keep) if k]
+    # A ring needs four positions to stay a valid polygon.
+    if points[0] == points[-1] and len(out) < 4:
+        return points
+    return out
+
+
+def simplify_geometry(geometry: Dict[str, Any], tolerance_m: float) -> Dict[str, Any]:
+    if geometry["type"] == "LineString":
+        return {"type": "LineString", "coordinates": simplify_line(geometry["coordinates"], tolerance_m)}
+    if geometry["type"] == "Polygon":
+        return {"type": "Polygon", "coordinates": [simplify_line(ring, tolerance_m) for ring in geometry["coordinates"]]}
+    return geometry
+
+
+def encode_polyline(points: Sequence[Sequence[float]], precision: int = POLYLINE_PRECISION) -> str:
+    """
+    Encode ``[lon, lat]`` points as a Google encoded polyline. The format
+    stores latitude first, so pairs are swapped on the way in.
+    """
+    factor = 10 ** precision
+    out = []
+    prev_lat = prev_lon = 0
+    for p in points:
+        lat = int(round(p[1] * factor))
+        lon = int(round(p[0] * factor))
+        for delta in (lat - prev_lat, lon - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        prev_lat, prev_lon = lat, lon
+    return "".join(out)
+
+
+def decode_polyline(encoded: str, precision: int = POLYLINE_PRECISION) -> List[List[float]]:
+    """Inverse of ``encode_polyline``; returns ``[lon, lat]`` points."""
+    factor = 10 ** precision
+    points = []
+    index = lat = lon = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1F) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append([lon / factor, lat / factor])
+    return points
+
+
+def compact_corridor(
+    track: Dict[str, Any],
+    corridor: Optional[Dict[str, Any]],
+    width_yards: Optional[int],
+    corridor_segments: Optional[int] = None,
+    simplify_m: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """The corridor regenerated with ``corridor_segments`` and/or simplified."""
+    if corridor is not None and corridor_segments and width_yards:
+        (lon0, lat0), (lon1, lat1) = track["coordinates"][0], track["coordinates"][-1]
+        corridor = corridor_polygon(lat0, lon0, lat1, lon1, width_yards * 0.9144 / 2.0, quad_segs=corridor_segments)
+    if corridor is not None and simplify_m:
+        corridor = simplify_geometry(corridor, simplify_m)
+    return corridor
+
+
+def compact_geometry(
+    track: Dict[str, Any],
+    closest: Dict[str, Any],
+    corridor: Optional[Dict[str, Any]],
+    width_yards: Optional[int],
+    precision: Optional[int] = None,
+    corridor_segments: Optional[int] = None,
+    simplify_m: Optional[float] = None,
+    geometry_format: str = "geojson",
+) -> Dict[str, Any]:
+    """
+    Apply the output options to one result's parsed geometry and return the
+    geometry fields of the serialized row.
+    """
+    corridor = compact_corridor(track, corridor, width_yards, corridor_segments, simplify_m)
+
+    if geometry_format == "polyline":
+        p = POLYLINE_PRECISION if precision is None else precision
+        return {
+            "track_geojson": None,
+            "track_polyline": encode_polyline(track["coordinates"], p),
+            "closest_point_geojson": {"type": "Point", "coordinates": round_coords(closest["coordinates"], p)},
+            "corridor_geojson": None,
+            "corridor_polyline": encode_polyline(corridor["coordinates"][0], p) if corridor is not None else None,
+        }
+
+    if precision is not None:
+        track = {**track, "coordinates": round_coords(track["coordinates"], precision)}
+        closest = {**closest, "coordinates": round_coords(closest["coordinates"], precision)}
+        if corridor is not None:
+            corridor = {**corridor, "coordinates": round_coords(corridor["coordinates"], precision)}
+    return {"track_geojson": track, "closest_point_geojson": closest, "corridor_geojson": corridor}
@@ -1,7 +1,10 @@
+import json
+import sys
+import threading
 import time
-from collections import deque
+from collections import OrderedDict, deque
 from dataclasses import dataclass
-from typing import Any, Dict, Tuple, Optional
+from typing import Any, Callable, Dict, Tuple, Optional
 
 
 @dataclass
@@ -38,33 +41,122 @@ class SimpleRateLimiter:
         return True
 
 
+def _approx_size(value: Any) -> int:
+    """Approximate memory cost of a cached value: its compact JSON length."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    try:
+        return len(json.dumps(value, default=str, separators=(",", ":")))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
 class TTLCache:
     """
-    Simple in-memory TTL cache.
-    Stores JSON-serializable objects.
+    In-memory LRU cache with a per-entry TTL.
+
+    ``get``/``set`` are O(1): ``_store`` is kept in recency order, so the
+    least recently used entry is always at the front. Bounded by
+    ``max_items`` and by ``max_bytes`` (approximate serialized size).
+    Expired entries are dropped when read and by a full sweep at most once
+    per ``sweep_seconds``.
     """
-    def __init__(self, ttl_seconds: int = 6 * 3600, max_items: int = 5000):
+    backend = "memory"
+
+    def __init__(self, ttl_seconds: int = 6 * 3600, max_items: int = 5000, max_bytes: int = 256 * 1024 * 1024, sweep_seconds: float = 60.0):
         self.ttl = ttl_seconds
         self.max_items = max_items
-        self._store: Dict[Tuple[Any, ...], Tuple[float, Any]] = {}
+        self.max_bytes = max_bytes
+        self.sweep_seconds = sweep_seconds
+        self._store: "OrderedDict[Tuple[Any, ...], Tuple[float, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = time.time() + sweep_seconds
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _drop(self, key: Tuple[Any, ...]) -> None:
+        item = self._store.pop(key, None)
+        if item is not None:
+            self.bytes -= item[2]
+
+    def _sweep(self, now: float) -> None:
+        expired = [key for key, item in self._store.items() if now >= item[0]]
+        for key in expired:
+            self._drop(key)
+        self.expirations += len(expired)
+        self._next_sweep = now + self.sweep_seconds
 
-    def get(self, key: Tuple[Any, ...]) -> Optional[Any]:
+    def get(self, key: Tuple[Any, ...], count_miss: bool = True) -> Optional[Any]:
+        """Live value for ``key``; ``count_miss=False`` for probes a counted lookup follows."""
         now = time.time()
-        item = self._store.get(key)
-        if not item:
-            return None
-        expires_at, value = item
-        if now >= expires_at:
-            self._store.pop(key, None)
-            return None
-        return value
-
-    def set(self, key: Tuple[Any, ...], value: Any) -> None:
+        with self._lock:
+            item = self._store.get(key)
+            if item is None:
+                if count_miss:
+                    self.misses += 1
+                return None
+            if now >= item[0]:
+                self._drop(key)
+                self.expirations += 1
+                if count_miss:
+                    self.misses += 1
+                return None
+            self._store.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def contains(self, key: Tuple[Any, ...]) -> bool:
+        """Whether ``key`` holds a live entry; not counted as a lookup and leaves recency alone."""
+        now = time.time()
+        with self._lock:
+            item = self._store.get(key)
+            return item is not None and now < item[0]
+
+    def set(self, key: Tuple[Any, ...], value: Any, size: Optional[int] = None) -> None:
+        if size is None:
+            size = _approx_size(value)
         now = time.time()
+        with self._lock:
+            self._drop(key)
+            if size > self.max_bytes:
+                return
+            self._store[key] = (now + self.ttl, value, size)
+            self.bytes += size
+
+            if now >= self._next_sweep:
+                self._sweep(now)
+            while len(self._store) > self.max_items or self.bytes > self.max_bytes:
+                _, (_, _, evicted) = self._store.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._store.clear()
+            self.bytes = 0
 
-        # basic eviction: if too big, drop oldest by expiry time
-        if len(self._store) >= self.max_items:
-            oldest_key = min(self._store.items(), key=lambda kv: kv[1][0])[0]
-            self._store.pop(oldest_key, None)
+    def purge(self, predicate: Callable[[Tuple[Any, ...]], bool]) -> int:
+        """Drop every entry whose key matches ``predicate``."""
+        with self._lock:
+            doomed = [key for key in self._store if predicate(key)]
+            for key in doomed:
+                self._drop(key)
+            return len(doomed)
 
-        self._store[key] = (now + self.ttl, value)
\ No newline at end of file
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend,
+                "items": len(self._store),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
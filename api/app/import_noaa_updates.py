@@ -3,7 +3,8 @@ from datetime import datetime, timezone
 
 from sqlalchemy import create_engine, text
 
-from .import_noaa_year import ensure_downloaded_filename, import_year, latest_details_files_by_year
+from .import_noaa_year import ensure_downloaded_filename, import_year, latest_details_files_by_year, refresh_dataset_stats
+from .tiles import DELETE_STALE_TILES_SQL
 
 engine = create_engine(os.environ["DATABASE_URL"])
 
@@ -117,6 +118,13 @@ def refresh_updates(start_year: int = 1950) -> list[dict[str, int | str]]:
             }
         )
 
+    corrected_rows = cleanup_future_dates()
+    if corrected_rows:
+        import_log.append({"year": "cleanup", "revision": "date-fix", "attempted_rows": corrected_rows, "inserted_rows": corrected_rows, "filename": "tornado_event"})
+        # Shifted rows move between years; recount everything (rare).
+        with engine.begin() as conn:
+            refresh_dataset_stats(conn)
+
     dataset_version = max((info["revision"] for info in latest.values()), default=None)
     with engine.begin() as conn:
         conn.execute(
@@ -126,10 +134,8 @@ def refresh_updates(start_year: int = 1950) -> list[dict[str, int | str]]:
                 "dataset_version": dataset_version,
             },
         )
-
-    corrected_rows = cleanup_future_dates()
-    if corrected_rows:
-        import_log.append({"year": "cleanup", "revision": "date-fix", "attempted_rows": corrected_rows, "inserted_rows": corrected_rows, "filename": "tornado_event"})
+        # Tiles are stored under "" while no version exists (see TileStore.get).
+        conn.execute(DELETE_STALE_TILES_SQL, {"dataset_version": dataset_version or ""})
 
     return import_log
 
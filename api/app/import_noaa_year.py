@@ -5,9 +5,12 @@ import subprocess
 import sys
 from datetime import datetime
 from pathlib import Path
+from typing import Iterable
 
 from sqlalchemy import create_engine, text
 
+from .density import DENSITY_CELLS_PER_DEGREE
+
 BASE_URL = "https://www.ncei.noaa.gov/pub/data/swdi/stormevents/csvfiles/"
 DATA_DIR = Path("/data")
 
@@ -31,6 +34,87 @@ VALUES (
 ON CONFLICT (event_id) DO NOTHING;
 """)
 
+# Track GeoJSON and the width/2 corridor only change when NOAA publishes a new
+# revision, so they are computed once here instead of on every request.
+# Keep in sync with the backfill at the end of sql/001_init.sql.
+MATERIALIZE_GEOMETRY_SQL = text("""
+UPDATE tornado_event
+SET track_geojson = ST_AsGeoJSON(geom_line),
+    corridor_geojson = CASE
+      WHEN tor_width_yards IS NULL THEN NULL
+      ELSE ST_AsGeoJSON(ST_Buffer(geog_line, (tor_width_yards * 0.9144) / 2.0, 'endcap=round join=round')::geometry)
+    END
+WHERE track_geojson IS NULL
+  AND geom_line IS NOT NULL;
+""")
+
+# Per-year and per-state event counts behind /meta, rebuilt only for the years
+# an import touched (begin_dt range, so the btree index serves it). The
+# dataset-wide summary is then rolled up from these small tables.
+DELETE_YEAR_STATS_SQL = text("""
+DELETE FROM dataset_year_stats WHERE year >= :year_from AND year < :year_to;
+""")
+
+INSERT_YEAR_STATS_SQL = text("""
+INSERT INTO dataset_year_stats (year, event_count, min_begin_dt, max_begin_dt)
+SELECT begin_year, COUNT(*), MIN(begin_dt), MAX(begin_dt)
+FROM tornado_event
+WHERE begin_dt >= :dt_from AND begin_dt < :dt_to
+GROUP BY begin_year;
+""")
+
+DELETE_STATE_STATS_SQL = text("""
+DELETE FROM dataset_state_stats WHERE year >= :year_from AND year < :year_to;
+""")
+
+INSERT_STATE_STATS_SQL = text("""
+INSERT INTO dataset_state_stats (year, state, event_count)
+SELECT begin_year, COALESCE(state, 'UNKNOWN'), COUNT(*)
+FROM tornado_event
+WHERE begin_dt >= :dt_from AND begin_dt < :dt_to
+GROUP BY begin_year, COALESCE(state, 'UNKNOWN');
+""")
+
+# Touchdown density grid for /density (see density.py): begin points binned
+# into 1/DENSITY_CELLS_PER_DEGREE degree cells, by year and F/EF rating
+# (-1 when unrated).
+DELETE_DENSITY_SQL = text("""
+DELETE FROM density_cell WHERE year >= :year_from AND year < :year_to;
+""")
+
+INSERT_DENSITY_SQL = text("""
+INSERT INTO density_cell (cell_lat, cell_lon, year, f_rating, event_count)
+SELECT
+  CAST(floor(begin_lat * :cells_per_degree) AS integer),
+  CAST(floor(begin_lon * :cells_per_degree) AS integer),
+  begin_year,
+  COALESCE(CAST(substring(tor_f_scale FROM '[0-9]') AS smallint), -1),
+  COUNT(*)
+FROM tornado_event
+WHERE begin_dt >= :dt_from AND begin_dt < :dt_to
+  AND begin_lat IS NOT NULL AND begin_lon IS NOT NULL
+GROUP BY 1, 2, 3, 4;
+""")
+
+# Keep in sync with the one-time backfill at the end of sql/001_init.sql.
+UPDATE_META_SUMMARY_SQL = text("""
+UPDATE dataset_refresh_meta m
+SET tornado_event_count = s.total + (SELECT COUNT(*) FROM tornado_event WHERE begin_dt IS NULL),
+    min_begin_dt = s.min_begin_dt,
+    max_begin_dt = s.max_begin_dt,
+    year_counts = COALESCE((SELECT jsonb_object_agg(year, event_count) FROM dataset_year_stats), '{}'::jsonb),
+    state_counts = COALESCE((
+      SELECT jsonb_object_agg(state, n)
+      FROM (SELECT state, SUM(event_count) AS n FROM dataset_state_stats GROUP BY state) x
+    ), '{}'::jsonb),
+    updated_at = NOW()
+FROM (
+  SELECT COALESCE(SUM(event_count), 0) AS total, MIN(min_begin_dt) AS min_begin_dt, MAX(max_begin_dt) AS max_begin_dt
+  FROM dataset_year_stats
+) s
+WHERE m.id = 1;
+""")
+
 NEEDED = [
     "EVENT_ID", "STATE", "CZ_NAME", "WFO",
     "BEGIN_DATE_TIME", "END_DATE_TIME", "EVENT_TYPE",
@@ -90,6 +174,29 @@ def source_year_from_filename(csv_path: Path) -> int | None:
     return None
 
 
+def refresh_dataset_stats(conn, years: Iterable[int] | None = None) -> None:
+    """
+    Recount ``years`` (every year when None) in the per-year stats and the
+    density grid, then roll up the /meta summary.
+    """
+    ranges = [(1, 9999)] if years is None else [(year, year + 1) for year in sorted(set(years))]
+    for year_from, year_to in ranges:
+        params = {
+            "year_from": year_from,
+            "year_to": year_to,
+            "dt_from": datetime(year_from, 1, 1),
+            "dt_to": datetime(year_to, 1, 1),
+            "cells_per_degree": DENSITY_CELLS_PER_DEGREE,
+        }
+        conn.execute(DELETE_YEAR_STATS_SQL, params)
+        conn.execute(INSERT_YEAR_STATS_SQL, params)
+        conn.execute(DELETE_STATE_STATS_SQL, params)
+        conn.execute(INSERT_STATE_STATS_SQL, params)
+        conn.execute(DELETE_DENSITY_SQL, params)
+        conn.execute(INSERT_DENSITY_SQL, params)
+    conn.execute(UPDATE_META_SUMMARY_SQL)
+
+
 def latest_details_filename(year: int) -> str:
     html = subprocess.check_output(["curl", "-s", BASE_URL], text=True)
     pattern = re.compile(rf"(StormEvents_details-ftp_v1\.0_d{year}_c(\d+)\.csv\.gz)")
@@ -146,6 +253,7 @@ def import_year(csv_path: Path) -> tuple[int, int]:
     attempted = 0
     inserted = 0
     source_year = source_year_from_filename(csv_path)
+    years = {source_year} if source_year is not None else set()
     with engine.begin() as conn:
         with open(csv_path, newline="", encoding="utf-8") as f:
             r = csv.DictReader(f)
@@ -186,6 +294,11 @@ def import_year(csv_path: Path) -> tuple[int, int]:
                 result = conn.execute(INSERT_SQL, params)
                 attempted += 1
                 inserted += int(result.rowcount or 0)
+                if params["begin_dt"]:
+                    years.add(int(params["begin_dt"][:4]))
+
+        conn.execute(MATERIALIZE_GEOMETRY_SQL)
+        refresh_dataset_stats(conn, years)
     return attempted, inserted
 
 
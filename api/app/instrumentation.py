@@ -0,0 +1,65 @@
+import threading
+from typing import Any, Dict
+
+
+class QueryTimings:
+    """
+    Per-statement timing counters, shared by all request threads.
+
+    ``record`` takes the client-side round trip of every execution;
+    ``record_explain`` takes the server's planning/execution split from a
+    sampled ``EXPLAIN (ANALYZE)`` of the same statement.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, name: str) -> Dict[str, float]:
+        entry = self._stats.get(name)
+        if entry is None:
+            entry = {
+                "calls": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "explained": 0,
+                "planning_ms_total": 0.0,
+                "execution_ms_total": 0.0,
+            }
+            self._stats[name] = entry
+        return entry
+
+    def record(self, name: str, elapsed_ms: float) -> None:
+        with self._lock:
+            entry = self._entry(name)
+            entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+
+    def record_explain(self, name: str, planning_ms: float, execution_ms: float) -> None:
+        with self._lock:
+            entry = self._entry(name)
+            entry["explained"] += 1
+            entry["planning_ms_total"] += planning_ms
+            entry["execution_ms_total"] += execution_ms
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            out = {}
+            for name, e in self._stats.items():
+                explained = e["explained"]
+                out[name] = {
+                    "calls": int(e["calls"]),
+                    "mean_ms": round(e["total_ms"] / e["calls"], 3) if e["calls"] else None,
+                    "max_ms": round(e["max_ms"], 3),
+                    "explained": int(explained),
+                    "mean_planning_ms": round(e["planning_ms_total"] / explained, 3) if explained else None,
+                    "mean_execution_ms": round(e["execution_ms_total"] / explained, 3) if explained else None,
+                }
+            return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+query_timings = QueryTimings()
@@ -0,0 +1,401 @@
+"""
+Bulk address jobs.
+
+An uploaded address file is spooled to disk and processed with bounded
+concurrency (geocode, then nearest-track lookup). Results are appended to an
+NDJSON file one line per input row, so memory stays flat regardless of input
+size. Progress lives in ``address_job`` so any worker can report status and
+stream results while the job runs.
+"""
+import asyncio
+import contextlib
+import csv
+import io
+import itertools
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from .db import engine
+from .geocode import NoGeocodeMatchError
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+Lookup = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+ACTIVE_STATUSES = ("queued", "running")
+# Upload rows read per worker-thread hop while a job runs.
+READ_BATCH_ROWS = 500
+CSV_COLUMNS = [
+    "row", "address", "status", "lat", "lon", "provider",
+    "event_id", "distance", "unit", "distance_type", "tor_f_scale", "begin_dt", "state",
+]
+
+INSERT_JOB_SQL = text("""
+INSERT INTO address_job (job_id, status, options, total_rows)
+VALUES (:job_id, 'queued', CAST(:options AS jsonb), :total_rows);
+""")
+
+START_JOB_SQL = text("""
+UPDATE address_job
+SET status = 'running', started_at = NOW(), updated_at = NOW()
+WHERE job_id = :job_id;
+""")
+
+PROGRESS_JOB_SQL = text("""
+UPDATE address_job
+SET processed_rows = :processed_rows, failed_rows = :failed_rows, updated_at = NOW()
+WHERE job_id = :job_id;
+""")
+
+FINISH_JOB_SQL = text("""
+UPDATE address_job
+SET status = :status,
+    processed_rows = :processed_rows,
+    failed_rows = :failed_rows,
+    error = :error,
+    finished_at = NOW(),
+    updated_at = NOW()
+WHERE job_id = :job_id;
+""")
+
+SELECT_JOB_SQL = text("""
+SELECT job_id, status, options, total_rows, processed_rows, failed_rows, error,
+       created_at, started_at, finished_at, updated_at, NOW() AS db_now
+FROM address_job
+WHERE job_id = :job_id;
+""")
+
+
+# Jobs whose last update is older than the retention window; their files go too.
+DELETE_EXPIRED_JOBS_SQL = text("""
+DELETE FROM address_job
+WHERE updated_at < NOW() - make_interval(hours => CAST(:retention_hours AS integer))
+RETURNING job_id;
+""")
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+class EmptyUploadError(Exception):
+    pass
+
+
+class JobStore:
+    """``address_job`` persistence."""
+    def create(self, job_id: str, total_rows: int, options: Dict[str, Any]) -> None:
+        with engine.begin() as conn:
+            conn.execute(INSERT_JOB_SQL, {"job_id": job_id, "options": json.dumps(options), "total_rows": total_rows})
+
+    def start(self, job_id: str) -> None:
+        with engine.begin() as conn:
+            conn.execute(START_JOB_SQL, {"job_id": job_id})
+
+    def progress(self, job_id: str, processed_rows: int, failed_rows: int) -> None:
+        with engine.begin() as conn:
+            conn.execute(PROGRESS_JOB_SQL, {"job_id": job_id, "processed_rows": processed_rows, "failed_rows": failed_rows})
+
+    def finish(self, job_id: str, status: str, processed_rows: int, failed_rows: int, error: Optional[str] = None) -> None:
+        with engine.begin() as conn:
+            conn.execute(
+                FINISH_JOB_SQL,
+                {"job_id": job_id, "status": status, "processed_rows": processed_rows, "failed_rows": failed_rows, "error": error},
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with engine.begin() as conn:
+            row = conn.execute(SELECT_JOB_SQL, {"job_id": job_id}).mappings().first()
+        return dict(row) if row else None
+
+    def delete_expired(self, retention_hours: int) -> List[str]:
+        with engine.begin() as conn:
+            return [r[0] for r in conn.execute(DELETE_EXPIRED_JOBS_SQL, {"retention_hours": retention_hours})]
+
+
+def iter_addresses(path: Path) -> Iterator[Tuple[int, str]]:
+    """
+    Yield ``(row_number, address)`` from a spooled upload.
+
+    A CSV whose header has an ``address`` column is read as CSV; anything
+    else is treated as one address per line (addresses contain commas, so
+    plain lines are never split).
+    """
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        first = f.readline()
+        header = next(csv.reader([first]), [])
+        columns = [c.strip().lower() for c in header]
+        if "address" in columns:
+            col = columns.index("address")
+            for row_no, row in enumerate(csv.reader(f), start=1):
+                if len(row) > col and row[col].strip():
+                    yield row_no, row[col].strip()
+            return
+
+        row_no = 0
+        for line in itertools.chain([first], f):
+            if line.strip():
+                row_no += 1
+                yield row_no, line.strip()
+
+
+def count_addresses(path: Path) -> int:
+    return sum(1 for _ in iter_addresses(path))
+
+
+def _append_line(out, line: str) -> None:
+    out.write(line)
+    out.flush()
+
+
+def _csv_line(record: Dict[str, Any]) -> bytes:
+    top = (record.get("top_results") or [{}])[0]
+    values = [
+        record.get("row"), record.get("address"), record.get("status"),
+        record.get("lat"), record.get("lon"), record.get("provider"),
+        top.get("event_id"), top.get("selected_distance"), top.get("selected_unit"),
+        top.get("distance_type"), top.get("tor_f_scale"), top.get("begin_dt"), top.get("state"),
+    ]
+    buf = io.StringIO()
+    csv.writer(buf).writerow(["" if v is None else v for v in values])
+    return buf.getvalue().encode("utf-8")
+
+
+class JobRunner:
+    """
+    Runs address jobs inside the API process.
+
+    ``lookup(address, options)`` does the geocode + nearest-track work for one
+    row and returns the per-row payload.
+    """
+    def __init__(self, lookup: Lookup, store: Optional[JobStore] = None, job_dir: Optional[str] = None, concurrency: Optional[int] = None):
+        self.lookup = lookup
+        self.store = store or JobStore()
+        self.job_dir = Path(job_dir or settings.job_dir)
+        self.concurrency = concurrency or settings.job_concurrency
+        self.progress_every_seconds = 2.0
+        self.poll_seconds = 0.5
+        self.cleanup_every_seconds = 3600.0
+        self._last_cleanup = float("-inf")
+        self._tasks: set = set()
+
+    def input_path(self, job_id: str) -> Path:
+        return self.job_dir / f"{job_id}.input"
+
+    def results_path(self, job_id: str) -> Path:
+        return self.job_dir / f"{job_id}.ndjson"
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def submit(self, chunks: AsyncIterator[bytes], options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Spool the upload and start the job. Raises ``UploadTooLargeError`` or
+        ``EmptyUploadError`` before anything is recorded.
+        """
+        if time.monotonic() - self._last_cleanup >= self.cleanup_every_seconds:
+            self._last_cleanup = time.monotonic()
+            self._spawn(self._cleanup())
+
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self.job_dir.mkdir, parents=True, exist_ok=True)
+        input_path = self.input_path(job_id)
+
+        max_bytes = settings.job_max_upload_mb * 1024 * 1024
+        size = 0
+        try:
+            f = await asyncio.to_thread(open, input_path, "wb")
+            try:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise UploadTooLargeError(f"Upload exceeds {settings.job_max_upload_mb} MB.")
+                    await asyncio.to_thread(f.write, chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+            total_rows = await asyncio.to_thread(count_addresses, input_path)
+            if total_rows == 0:
+                raise EmptyUploadError("No addresses found in upload.")
+        except (UploadTooLargeError, EmptyUploadError):
+            input_path.unlink(missing_ok=True)
+            raise
+
+        await asyncio.to_thread(self.results_path(job_id).touch)
+        await asyncio.to_thread(self.store.create, job_id, total_rows, options)
+        self._spawn(self._run(job_id, options))
+        return {"job_id": job_id, "status": "queued", "total_rows": total_rows}
+
+    def cleanup(self) -> int:
+        """
+        Delete expired jobs: their ``address_job`` rows, plus every file in
+        ``job_dir`` untouched for ``job_retention_hours`` (orphans included).
+        Returns the number of files removed.
+        """
+        retention_seconds = settings.job_retention_hours * 3600
+        expired = set(self.store.delete_expired(settings.job_retention_hours))
+        if not self.job_dir.exists():
+            return 0
+        cutoff = time.time() - retention_seconds
+        removed = 0
+        for path in self.job_dir.iterdir():
+            if path.suffix not in (".input", ".ndjson"):
+                continue
+            try:
+                if path.stem in expired or path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    async def _cleanup(self) -> None:
+        try:
+            removed = await asyncio.to_thread(self.cleanup)
+            if removed:
+                logger.info("Removed %d expired address job files", removed)
+        except Exception:
+            logger.warning("Address job cleanup failed", exc_info=True)
+
+    async def _process(self, row_no: int, address: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        record: Dict[str, Any] = {"row": row_no, "address": address}
+        try:
+            record.update(await self.lookup(address, options))
+            record["status"] = "ok"
+        except NoGeocodeMatchError:
+            record["status"] = "no_match"
+        except Exception as exc:
+            logger.warning("Address job row %d failed: %s", row_no, exc)
+            record["status"] = "error"
+            record["error"] = str(exc) or exc.__class__.__name__
+        return record
+
+    async def _run(self, job_id: str, options: Dict[str, Any]) -> None:
+        processed = 0
+        failed = 0
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        last_progress = time.monotonic()
+
+        async def produce():
+            rows = iter_addresses(self.input_path(job_id))
+            try:
+                while True:
+                    batch = await asyncio.to_thread(list, itertools.islice(rows, READ_BATCH_ROWS))
+                    if not batch:
+                        break
+                    for item in batch:
+                        await queue.put(item)
+            finally:
+                # Raises if a cancelled read is still running on its thread;
+                # the generator then closes its file when it is collected.
+                with contextlib.suppress(ValueError):
+                    rows.close()
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def work(out):
+            nonlocal processed, failed, last_progress
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                record = await self._process(item[0], item[1], options)
+                await asyncio.to_thread(_append_line, out, json.dumps(record, default=str) + "\n")
+                processed += 1
+                failed += int(record["status"] != "ok")
+                if time.monotonic() - last_progress >= self.progress_every_seconds:
+                    last_progress = time.monotonic()
+                    await asyncio.to_thread(self.store.progress, job_id, processed, failed)
+
+        try:
+            await asyncio.to_thread(self.store.start, job_id)
+            out = await asyncio.to_thread(open, self.results_path(job_id), "a", encoding="utf-8")
+            try:
+                tasks = [asyncio.create_task(produce()), *(asyncio.create_task(work(out)) for _ in range(self.concurrency))]
+                try:
+                    await asyncio.gather(*tasks)
+                finally:
+                    # After a failure the producer would wait forever on a full
+                    # queue (or the workers on an empty one).
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                await asyncio.to_thread(out.close)
+            await asyncio.to_thread(self.store.finish, job_id, "done", processed, failed)
+        except Exception as exc:
+            logger.exception("Address job %s failed", job_id)
+            await asyncio.to_thread(self.store.finish, job_id, "failed", processed, failed, str(exc))
+        finally:
+            self.input_path(job_id).unlink(missing_ok=True)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+
+        now = job.get("db_now") or datetime.utcnow()
+        status = job["status"]
+        updated_at = job.get("updated_at")
+        if status in ACTIVE_STATUSES and updated_at and (now - updated_at).total_seconds() > settings.job_stale_seconds:
+            # No progress heartbeat: the worker running it went away.
+            status = "interrupted"
+
+        processed = int(job.get("processed_rows") or 0)
+        total = int(job.get("total_rows") or 0)
+        started_at = job.get("started_at")
+        finished_at = job.get("finished_at")
+        elapsed = ((finished_at or now) - started_at).total_seconds() if started_at else 0.0
+        return {
+            "job_id": job["job_id"],
+            "status": status,
+            "total_rows": total,
+            "processed_rows": processed,
+            "failed_rows": int(job.get("failed_rows") or 0),
+            "rows_remaining": max(0, total - processed),
+            "rows_per_second": round(processed / elapsed, 2) if elapsed > 0 else None,
+            "created_at": job["created_at"].isoformat() if job.get("created_at") else None,
+            "started_at": started_at.isoformat() if started_at else None,
+            "finished_at": finished_at.isoformat() if finished_at else None,
+            "error": job.get("error"),
+        }
+
+    async def stream_results(self, job_id: str, fmt: str = "ndjson") -> AsyncIterator[bytes]:
+        """Yield result lines, following the file until the job stops running."""
+        if fmt == "csv":
+            buf = io.StringIO()
+            csv.writer(buf).writerow(CSV_COLUMNS)
+            yield buf.getvalue().encode("utf-8")
+
+        f = await asyncio.to_thread(open, self.results_path(job_id), "rb")
+        try:
+            pending = b""
+            finished = False
+            while True:
+                chunk = await asyncio.to_thread(f.read, 64 * 1024)
+                if chunk:
+                    pending += chunk
+                    *lines, pending = pending.split(b"\n")
+                    for line in lines:
+                        if not line:
+                            continue
+                        yield line + b"\n" if fmt == "ndjson" else _csv_line(json.loads(line))
+                    continue
+                if finished:
+                    return
+                status = await asyncio.to_thread(self.status, job_id)
+                # One more pass after the job stops, to drain its last lines.
+                finished = status is None or status["status"] not in ACTIVE_STATUSES
+                if not finished:
+                    await asyncio.sleep(self.poll_seconds)
+        finally:
+            f.close()
@@ -1,17 +1,54 @@
+import functools
+import hashlib
 import json
 import logging
+import random
+import threading
+import time
 from datetime import datetime
 from typing import Literal
 
-from fastapi import FastAPI, Header, HTTPException, Query, Request
+import anyio
+import orjson
+import psycopg
+
+from fastapi import FastAPI, Header, HTTPException, Path, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DataError, InternalError, OperationalError
 
-from .db import engine, run_migrations
+from .compression import ENCODINGS, compress, encoded_headers, negotiate, should_compress
+from .dataset import DatasetState
+from .density import DENSITY_WINDOW_SQL, cell_window, density_payload, window_params, window_shape
+from .db import PREPARE_OPTION, db_limiter, engine, replica_router, run_db, run_migrations, stream_limiter
+from .exposure import EXPOSURE_SQL, MAX_RADIUS_M, candidate_arrays, group_by_point, index_candidates, summarize
+from .geometry import POLYLINE_PRECISION, compact_corridor, compact_geometry
 from .geocode import GeocoderUnavailableError, NoGeocodeMatchError, geocode_oneline
-from .guardrails import RateLimitConfig, SimpleRateLimiter, TTLCache
-from .schemas import ClosestTornadoRequest, ClosestTornadoResponse
+from .cache import HotKeys, make_result_cache
+from .cell_cache import CELL_K, CELL_SQL, CellCache
+from .guardrails import RateLimitConfig, SimpleRateLimiter
+from .schemas import (
+    BatchClosestTornadoRequest,
+    BatchClosestTornadoResponse,
+    ClosestTornadoRequest,
+    ClosestTornadoResponse,
+    ExposureBatchRequest,
+    GeometryOptions,
+    ShapeClosestTornadoRequest,
+    ShapeClosestTornadoResponse,
+)
 from .import_noaa_updates import refresh_updates
+from .instrumentation import query_timings
+from .jobs import EmptyUploadError, JobRunner, UploadTooLargeError
 from .settings import settings
+from .shape import SHAPE_NEAREST_SQL, shape_params
+from .singleflight import SingleFlight
+from .tiles import MEDIA_TYPE as TILE_MEDIA_TYPE, TileStore
+from .track_index import TrackIndex
+from .within import STREAM_BATCH_SIZE, WITHIN_SQL, decode_cursor, encode_cursor, within_params
 from .web import router as web_router
 
 logger = logging.getLogger(__name__)
@@ -20,16 +57,58 @@ app = FastAPI(title="Closest Tornado API", version="0.6.0")
 app.include_router(web_router)
 
 rate_limiter = SimpleRateLimiter(RateLimitConfig(max_requests=30, window_seconds=60))
-result_cache = TTLCache(ttl_seconds=6 * 3600, max_items=5000)
+result_cache = make_result_cache()
+track_index: TrackIndex | None = None
+cell_cache: CellCache | None = (
+    CellCache(
+        settings.cell_cache_deg,
+        settings.cache_ttl_seconds,
+        settings.cell_cache_max_mb * 1024 * 1024,
+        max_radius_m=settings.cell_cache_max_radius_m,
+        max_rows=settings.cell_cache_max_rows,
+    )
+    if settings.cell_cache_enabled else None
+)
+hot_keys = HotKeys()
+# Identical concurrent geocodes / lookups run once and fan out to every waiter.
+geocode_flight = SingleFlight()
+build_flight = SingleFlight()
+dataset = DatasetState(
+    read=lambda fn: _read(fn),
+    poll_seconds=settings.dataset_poll_seconds,
+    on_change=lambda old, new: _on_dataset_change(new),
+)
+tile_store = TileStore(
+    read=lambda fn: _read(fn),
+    write=lambda fn: _write(fn),
+    store_max_zoom=settings.tile_store_max_zoom,
+    ttl_seconds=settings.cache_ttl_seconds,
+    max_bytes=settings.tile_cache_max_mb * 1024 * 1024,
+)
+_rewarm_lock = threading.Lock()
+_rewarmed_version: str | None = None
 
 
 def _current_year() -> int:
     return datetime.utcnow().year
 
 
+def _load_track_index() -> None:
+    global track_index
+    if settings.query_engine != "memory":
+        return
+    try:
+        track_index = TrackIndex.load(replica_router.replica() or engine)
+        logger.info("Loaded %d tornado segments into the in-process index", track_index.size)
+    except Exception:
+        logger.exception("Could not load in-process track index; falling back to PostGIS")
+        track_index = None
+
+
 @app.on_event("startup")
 def _startup():
     run_migrations()
+    _load_track_index()
 
 
 @app.get("/health")
@@ -37,42 +116,23 @@ def health():
     return {"ok": True}
 
 
-@app.get("/meta")
-def meta():
-    sql = text("""
-    SELECT
-      m.data_last_refreshed,
-      m.dataset_version,
-      m.updated_at,
-      COUNT(t.event_id) AS tornado_event_count,
-      MAX(t.begin_dt) AS max_begin_dt
-    FROM dataset_refresh_meta m
-    LEFT JOIN tornado_event t ON TRUE
-    WHERE m.id = 1
-    GROUP BY m.data_last_refreshed, m.dataset_version, m.updated_at;
-    """)
-
-    with engine.begin() as conn:
-        row = conn.execute(sql).mappings().first()
-
-    if not row:
-        return {
-            "data_last_refreshed": None,
-            "dataset_version": None,
-            "metadata_updated_at": None,
-            "tornado_event_count": 0,
-            "latest_event_begin_dt": None,
-        }
-
+@app.get("/stats")
+def stats():
     return {
-        "data_last_refreshed": row.get("data_last_refreshed").isoformat() if row.get("data_last_refreshed") else None,
-        "dataset_version": row.get("dataset_version"),
-        "metadata_updated_at": row.get("updated_at").isoformat() if row.get("updated_at") else None,
-        "tornado_event_count": int(row.get("tornado_event_count") or 0),
-        "latest_event_begin_dt": row.get("max_begin_dt").isoformat() if row.get("max_begin_dt") else None,
+        "queries": query_timings.snapshot(),
+        "replicas": replica_router.status(),
+        "result_cache": result_cache.stats(),
+        "cell_cache": cell_cache.stats() if cell_cache is not None else None,
+        "tiles": tile_store.stats(),
+        "coalescing": {"geocode": geocode_flight.stats(), "build_response": build_flight.stats()},
     }
 
 
+@app.get("/meta")
+def meta():
+    return dataset.meta()
+
+
 def _notes_for_row(edge_m: float | None) -> list[str]:
     notes = [
         "Tracks are built from Storm Events begin/end points; the real ground path can differ.",
@@ -85,7 +145,52 @@ def _notes_for_row(edge_m: float | None) -> list[str]:
     return notes
 
 
-def _serialize_row(row, units: str):
+def _geojson(value, raw: bool):
+    """Parse a GeoJSON column, or wrap it for orjson to splice in verbatim."""
+    if not value:
+        return None
+    return orjson.Fragment(value) if raw else json.loads(value)
+
+
+# Options that only touch the corridor; with just these, the track and
+# closest point keep the spliced-text fast path.
+CORRIDOR_OPTIONS = {"corridor_segments", "simplify_m"}
+
+
+def _geometry_fields(row, raw_geometry: bool, geometry: dict | None) -> dict:
+    corridor = row.get("corridor_geojson")
+    if not geometry or set(geometry) <= CORRIDOR_OPTIONS:
+        fields = {
+            "track_geojson": _geojson(row["track_geojson"], raw_geometry),
+            "closest_point_geojson": _geojson(row["closest_pt_geojson"], raw_geometry),
+            "corridor_geojson": _geojson(corridor, raw_geometry),
+        }
+        if geometry and corridor:
+            fields["corridor_geojson"] = compact_corridor(
+                orjson.loads(row["track_geojson"]), orjson.loads(corridor), row.get("tor_width_yards"), **geometry
+            )
+        return fields
+    return compact_geometry(
+        orjson.loads(row["track_geojson"]),
+        orjson.loads(row["closest_pt_geojson"]),
+        orjson.loads(corridor) if corridor else None,
+        row.get("tor_width_yards"),
+        **geometry,
+    )
+
+
+def _geometry_meta(geometry: dict | None) -> dict | None:
+    """Top-level note telling clients how to decode polyline geometry."""
+    if not geometry or geometry.get("geometry_format") != "polyline":
+        return None
+    return {"format": "polyline", "precision": geometry.get("precision", POLYLINE_PRECISION), "coordinate_order": "lat,lon"}
+
+
+def _geometry_key(geometry: dict | None) -> tuple:
+    return tuple(sorted((geometry or {}).items()))
+
+
+def _serialize_row(row, units: str, raw_geometry: bool = False, geometry: dict | None = None):
     center_m = float(row["center_m"])
     edge_m_val = row.get("edge_m")
     edge_m = float(edge_m_val) if edge_m_val is not None else None
@@ -123,9 +228,7 @@ def _serialize_row(row, units: str):
         "wfo": row.get("wfo"),
         "tor_length_miles": float(row["tor_length_miles"]) if row.get("tor_length_miles") is not None else None,
         "tor_width_yards": int(row["tor_width_yards"]) if row.get("tor_width_yards") is not None else None,
-        "track_geojson": json.loads(row["track_geojson"]) if row["track_geojson"] else None,
-        "closest_point_geojson": json.loads(row["closest_pt_geojson"]) if row["closest_pt_geojson"] else None,
-        "corridor_geojson": json.loads(row["corridor_geojson"]) if row.get("corridor_geojson") else None,
+        **_geometry_fields(row, raw_geometry, geometry),
         "notes": _notes_for_row(edge_m),
         "data_source": {
             "name": "NOAA NCEI Storm Events Database (Storm Data)",
@@ -134,73 +237,345 @@ def _serialize_row(row, units: str):
     }
 
 
-def _query_top_rows(lat: float, lon: float, limit: int = 5, start_year: int = 1950, end_year: int | None = None):
-    if end_year is None:
-        end_year = _current_year()
-    sql = text("""
-    WITH user_pt AS (
-      SELECT
-        ST_SetSRID(ST_Point(:lon, :lat), 4326) AS geom,
-        ST_SetSRID(ST_Point(:lon, :lat), 4326)::geography AS geog
-    ),
-    candidates AS (
-      SELECT
-        t.*,
-        ST_Distance((SELECT geog FROM user_pt), t.geog_line) AS center_m,
-        CASE
-          WHEN t.tor_width_yards IS NULL THEN NULL
-          ELSE GREATEST(
-            0,
-            ST_Distance((SELECT geog FROM user_pt), t.geog_line) - ((t.tor_width_yards * 0.9144) / 2.0)
-          )
-        END AS edge_m,
-        ST_AsGeoJSON(t.geom_line) AS track_geojson,
-        ST_AsGeoJSON(ST_ClosestPoint(t.geom_line, (SELECT geom FROM user_pt))) AS closest_pt_geojson,
-        CASE
-          WHEN t.tor_width_yards IS NULL THEN NULL
-          ELSE ST_AsGeoJSON(
-            ST_Buffer(
-              t.geog_line,
-              (t.tor_width_yards * 0.9144) / 2.0,
-              'endcap=round join=round'
-            )::geometry
-          )
-        END AS corridor_geojson
-      FROM tornado_event t
-      WHERE t.begin_dt IS NOT NULL
-        AND EXTRACT(YEAR FROM t.begin_dt) BETWEEN :start_year AND :end_year
-      ORDER BY t.geog_line <-> (SELECT geog FROM user_pt)
-      LIMIT 250
-    ),
-    ranked AS (
-      SELECT *,
-        COALESCE(edge_m, center_m) AS primary_m
-      FROM candidates
+# Adaptive candidate search: fetch the K nearest centerlines, and grow K until
+# no unseen track could still beat the current top_n on edge distance.
+CANDIDATE_K_START = 16
+CANDIDATE_K_GROWTH = 4
+# ``<->`` on geography is a sphere distance while ST_Distance uses the
+# spheroid; the two differ by well under half a percent.
+KNN_SPHERE_SLACK = 0.995
+
+# Set-based: one LATERAL KNN per input point, so a batch of points costs one
+# round trip. Single lookups go through the same statement with one point.
+NEAREST_SQL = text("""
+WITH pts AS (
+  SELECT
+    p.point_id,
+    ST_SetSRID(ST_Point(p.lon, p.lat), 4326) AS geom,
+    ST_SetSRID(ST_Point(p.lon, p.lat), 4326)::geography AS geog
+  FROM unnest(
+    CAST(:point_ids AS integer[]),
+    CAST(:lats AS double precision[]),
+    CAST(:lons AS double precision[])
+  ) AS p(point_id, lat, lon)
+)
+SELECT
+  pts.point_id,
+  t.event_id, t.begin_dt, t.end_dt, t.state, t.cz_name, t.wfo,
+  t.tor_f_scale, t.tor_length_miles, t.tor_width_yards,
+  r.center_m,
+  r.edge_m,
+  r.primary_m,
+  -- Track and corridor GeoJSON are materialized at import time; the
+  -- fallbacks only run for rows the import backfill has not reached yet.
+  -- Geometry is serialized only for the winning rows, never for the whole
+  -- candidate set.
+  COALESCE(t.track_geojson, ST_AsGeoJSON(t.geom_line)) AS track_geojson,
+  ST_AsGeoJSON(ST_ClosestPoint(t.geom_line, pts.geom)) AS closest_pt_geojson,
+  CASE
+    WHEN t.tor_width_yards IS NULL THEN NULL
+    ELSE COALESCE(
+      t.corridor_geojson,
+      ST_AsGeoJSON(
+        ST_Buffer(
+          t.geog_line,
+          (t.tor_width_yards * 0.9144) / 2.0,
+          'endcap=round join=round'
+        )::geometry
+      )
     )
-    SELECT *
-    FROM ranked
-    ORDER BY primary_m ASC
-    LIMIT :limit;
-    """)
+  END AS corridor_geojson,
+  r.rows_examined,
+  r.frontier_m,
+  mhw.max_half_width_m
+FROM pts
+CROSS JOIN LATERAL (
+  SELECT
+    s.event_id,
+    s.center_m,
+    s.edge_m,
+    COALESCE(s.edge_m, s.center_m) AS primary_m,
+    s.rows_examined,
+    s.frontier_m
+  FROM (
+    SELECT
+      c.event_id,
+      d.center_m,
+      CASE
+        WHEN c.tor_width_yards IS NULL THEN NULL
+        ELSE GREATEST(0, d.center_m - ((c.tor_width_yards * 0.9144) / 2.0))
+      END AS edge_m,
+      c.rows_examined,
+      c.frontier_m
+    FROM (
+      SELECT
+        knn.*,
+        ROW_NUMBER() OVER (ORDER BY knn.knn_m) AS knn_rank,
+        COUNT(*) OVER () AS rows_examined,
+        MAX(knn.knn_m) OVER () AS frontier_m
+      FROM (
+        SELECT
+          t.event_id,
+          t.geog_line,
+          t.tor_width_yards,
+          t.geog_line <-> pts.geog AS knn_m
+        FROM tornado_event t
+        WHERE t.begin_year BETWEEN CAST(:start_year AS integer) AND CAST(:end_year AS integer)
+        ORDER BY t.geog_line <-> pts.geog
+        LIMIT :k + 1
+      ) knn
+    ) c
+    CROSS JOIN LATERAL (
+      SELECT ST_Distance(pts.geog, c.geog_line) AS center_m
+    ) d
+    WHERE c.knn_rank <= :k
+  ) s
+  ORDER BY primary_m ASC, s.event_id ASC
+  LIMIT :limit
+) r
+JOIN tornado_event t ON t.event_id = r.event_id
+CROSS JOIN (
+  SELECT MAX(tor_width_yards) * 0.9144 / 2.0 AS max_half_width_m
+  FROM tornado_event
+) mhw
+ORDER BY pts.point_id, r.primary_m ASC, r.event_id ASC;
+""").execution_options(**{PREPARE_OPTION: True})
+
+# Points per NEAREST_SQL execution for batch lookups.
+BATCH_CHUNK_SIZE = 500
+
+
+class QueryRows(list):
+    """Result rows plus ``stats`` describing how they were found."""
+    def __init__(self, rows=(), stats: dict | None = None):
+        super().__init__(rows)
+        self.stats = stats or {}
+
+
+# Renders marked statements with $n placeholders for an explicit PREPARE.
+_PREPARE_DIALECT = postgresql.dialect(paramstyle="numeric_dollar")
+
+
+def _explain_plan(conn, sql, params: dict, name: str):
+    """
+    EXPLAIN output for one sample. A statement marked with
+    ``PREPARE_OPTION`` runs prepared in production, so it is explained as
+    ``EXECUTE`` of a copy prepared once per pooled connection: its planning
+    time then includes plan reuse under ``plan_cache_mode``, as the prepared
+    path sees it. Anything else is explained as plain text.
+    """
+    explain = "EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) "
+    if not sql.get_execution_options().get(PREPARE_OPTION) or conn.dialect.driver != "psycopg":
+        return conn.execute(text(explain + sql.text), params).scalar()
+    compiled = sql.compile(dialect=_PREPARE_DIALECT)
+    statement = f"explain_{name}"
+    prepared = conn.connection.info.setdefault("explain_prepared", set())
+    if statement not in prepared:
+        conn.exec_driver_sql(f"PREPARE {statement} AS {compiled.string}")
+        prepared.add(statement)
+    args = [params[key] for key in compiled.positiontup]
+    execute = f"EXECUTE {statement}" + (f"({', '.join(['%s'] * len(args))})" if args else "")
+    # EXECUTE arguments are spliced in as literals; a utility statement takes no bind parameters.
+    execute = psycopg.ClientCursor(conn.connection.driver_connection).mogrify(execute, args)
+    return conn.exec_driver_sql(explain + execute).scalar()
 
+
+def _explain_timings(conn, sql, params: dict, name: str) -> tuple[float, float]:
+    """
+    Planning and execution time (ms) from EXPLAIN ANALYZE, which runs the
+    query again: every sample doubles that request's query cost, so sampling
+    stays off unless ``query_explain_sample_rate`` is set for debugging.
+    """
+    with conn.begin_nested():
+        plan = _explain_plan(conn, sql, params, name)
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return float(plan[0]["Planning Time"]), float(plan[0]["Execution Time"])
+
+
+def _read(fn):
+    """
+    Run ``fn(conn)`` on a read replica when one is healthy, else the primary.
+    A replica that drops the connection is marked down and the call retried
+    on the primary.
+    """
+    replica = replica_router.replica()
+    if replica is not None:
+        try:
+            with replica.begin() as conn:
+                return fn(conn)
+        except OperationalError:
+            logger.warning("Read replica failed; retrying on primary", exc_info=True)
+            replica_router.mark_down(replica)
     with engine.begin() as conn:
-        result = conn.execute(sql, {"lat": lat, "lon": lon, "limit": limit, "start_year": start_year, "end_year": end_year}).mappings()
+        return fn(conn)
+
+
+def _write(fn):
+    with engine.begin() as conn:
+        return fn(conn)
+
+
+def _fetch_rows(sql, params: dict, name: str = "nearest") -> list:
+    def fetch(conn):
+        start = time.perf_counter()
+        result = conn.execute(sql, params).mappings()
         if hasattr(result, "all"):
-            return result.all()
-        first = result.first()
-        return [first] if first is not None else []
+            rows = result.all()
+        else:
+            first = result.first()
+            rows = [first] if first is not None else []
+        query_timings.record(name, (time.perf_counter() - start) * 1000.0)
+
+        if settings.query_explain_sample_rate > 0 and random.random() < settings.query_explain_sample_rate:
+            try:
+                query_timings.record_explain(name, *_explain_timings(conn, sql, params, name))
+            except Exception:
+                logger.warning("EXPLAIN sample for %s failed", name, exc_info=True)
+        return rows
 
+    return _read(fetch)
 
-def _build_response(lat: float, lon: float, provider: str, match_type: str | None, units: str, host_url: str, top_n: int = 5, start_year: int = 1950, end_year: int | None = None):
+
+def _search_is_complete(rows, k: int, limit: int) -> bool:
+    """
+    True when no track outside the first ``k`` centerlines can enter the top
+    ``limit``: every unseen track is at least ``frontier_m`` from its
+    centerline, so at least ``frontier_m - max_half_width_m`` from its edge.
+    """
+    head = rows[0]
+    examined = head.get("rows_examined")
+    if examined is None or int(examined) <= k:
+        return True  # the year window holds no more than k tracks
+    if len(rows) < limit:
+        return False
+    bound = float(head["frontier_m"]) * KNN_SPHERE_SLACK - float(head.get("max_half_width_m") or 0.0)
+    last = rows[limit - 1]
+    last_m = last.get("edge_m") if last.get("edge_m") is not None else last["center_m"]
+    return float(last_m) <= bound
+
+
+def _query_cells(points: list[tuple[float, float]], results: list, limit: int, start_year: int, end_year: int) -> None:
+    """
+    Answer points whose grid cell is cached, in place. A single-point lookup
+    that misses fills its cell; batches leave misses to the set-based query,
+    as does a fill that hit the radius or row cap.
+    """
+    version = dataset.version()
+    for i, (lat, lon) in enumerate(points):
+        key = cell_cache.key(version, lat, lon, start_year, end_year)
+        index = cell_cache.get(key)
+        hit = index is not None
+        if not hit and len(points) == 1:
+            index = cell_cache.store(key, _fetch_rows(CELL_SQL, cell_cache.params(lat, lon, start_year, end_year), name="cell"))
+        if index:
+            rows, stats = index.query_with_stats(lat, lon, limit=limit, start_year=start_year, end_year=end_year)
+            results[i] = QueryRows(rows, {"engine": "cell_cache", "cell_hit": hit, **stats})
+
+
+def _query_top_rows_batch(points: list[tuple[float, float]], limit: int = 5, start_year: int = 1950, end_year: int | None = None) -> list[QueryRows]:
+    """Top ``limit`` rows for every ``(lat, lon)`` in ``points``, in input order."""
+    if end_year is None:
+        end_year = _current_year()
+    if track_index is not None:
+        results = []
+        for lat, lon in points:
+            rows, stats = track_index.query_with_stats(lat, lon, limit=limit, start_year=start_year, end_year=end_year)
+            results.append(QueryRows(rows, {"engine": "memory", **stats}))
+        return results
+
+    results: list[QueryRows | None] = [None] * len(points)
+    if cell_cache is not None and limit <= CELL_K:
+        _query_cells(points, results, limit, start_year, end_year)
+
+    examined = [0] * len(points)
+    pending = [i for i, r in enumerate(results) if r is None]
+    k = max(CANDIDATE_K_START, limit)
+    rounds = 0
+    started = time.perf_counter()
+    while pending:
+        rounds += 1
+        grouped: dict[int, list] = {i: [] for i in pending}
+        for offset in range(0, len(pending), BATCH_CHUNK_SIZE):
+            chunk = pending[offset:offset + BATCH_CHUNK_SIZE]
+            rows = _fetch_rows(
+                NEAREST_SQL,
+                {
+                    "point_ids": chunk,
+                    "lats": [points[i][0] for i in chunk],
+                    "lons": [points[i][1] for i in chunk],
+                    "limit": limit,
+                    "k": k,
+                    "start_year": start_year,
+                    "end_year": end_year,
+                },
+            )
+            for row in rows:
+                grouped[int(row["point_id"])].append(row)
+
+        # Only points whose answer is not yet provably complete go round again.
+        still_pending = []
+        for i in pending:
+            rows = grouped[i]
+            if rows:
+                examined[i] += int(rows[0].get("rows_examined") or len(rows))
+            if not rows or _search_is_complete(rows, k, limit):
+                results[i] = QueryRows(rows, {
+                    "engine": "postgis",
+                    "rows_examined": examined[i],
+                    "rounds": rounds,
+                    "final_k": k,
+                    "query_ms": round((time.perf_counter() - started) * 1000.0, 3),
+                })
+            else:
+                still_pending.append(i)
+        pending = still_pending
+        k *= CANDIDATE_K_GROWTH
+
+    return results
+
+
+def _query_top_rows(lat: float, lon: float, limit: int = 5, start_year: int = 1950, end_year: int | None = None):
+    return _query_top_rows_batch([(lat, lon)], limit=limit, start_year=start_year, end_year=end_year)[0]
+
+
+def _query_shape_rows(geometry: dict, limit: int = 5, start_year: int = 1950, end_year: int | None = None) -> QueryRows:
+    """Top ``limit`` rows for a GeoJSON LineString or Polygon, growing K as for points."""
+    if end_year is None:
+        end_year = _current_year()
+    k = max(CANDIDATE_K_START, limit)
+    rounds = 0
+    started = time.perf_counter()
+    while True:
+        rounds += 1
+        params = shape_params(geometry, limit, k, start_year, end_year, settings.shape_segment_m, settings.shape_max_piece_vertices)
+        rows = _fetch_rows(SHAPE_NEAREST_SQL, params, name="shape")
+        if not rows or _search_is_complete(rows, k, limit):
+            return QueryRows(rows, {
+                "engine": "postgis",
+                "pieces": int(rows[0].get("pieces") or 0) if rows else 0,
+                "rows_examined": int(rows[0].get("rows_examined") or len(rows)) if rows else 0,
+                "rounds": rounds,
+                "final_k": k,
+                "query_ms": round((time.perf_counter() - started) * 1000.0, 3),
+            })
+        k *= CANDIDATE_K_GROWTH
+
+
+def _build_response(lat: float, lon: float, provider: str, match_type: str | None, units: str, host_url: str, top_n: int = 5, start_year: int = 1950, end_year: int | None = None, debug: bool = False, raw_geometry: bool = False, geometry: dict | None = None):
     if end_year is None:
         end_year = _current_year()
     rows = _query_top_rows(lat, lon, limit=top_n, start_year=start_year, end_year=end_year)
     if not rows:
         raise HTTPException(status_code=404, detail="No tornado data loaded.")
 
-    top_results = [_serialize_row(row, units) for row in rows]
+    stats = getattr(rows, "stats", {})
+    if stats:
+        logger.debug("closest-tornado lookup stats: %s", stats)
+
+    top_results = [_serialize_row(row, units, raw_geometry, geometry) for row in rows]
     share_url = f"{host_url}?lat={lat:.6f}&lon={lon:.6f}&units={units}&top_n={top_n}&start_year={start_year}&end_year={end_year}"
-    return {
+    response = {
         "query": {
             "lat": lat,
             "lon": lon,
@@ -211,6 +586,162 @@ def _build_response(lat: float, lon: float, provider: str, match_type: str | Non
         "top_results": top_results,
         "share_url": share_url,
     }
+    if geometry_meta := _geometry_meta(geometry):
+        response["geometry"] = geometry_meta
+    if debug:
+        response["debug"] = stats
+    return response
+
+
+def _render_response(**build_args) -> bytes:
+    """
+    ``_build_response`` encoded straight to JSON bytes. GeoJSON text from the
+    query is spliced in as-is, and the bytes skip response-model validation.
+    """
+    return orjson.dumps(_build_response(**build_args, raw_geometry=True), option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _json_response(body: bytes, headers: dict[str, str] | None = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _cache_call(fn, *args, **kwargs):
+    """
+    Call a ``result_cache`` method. The SQLite and Redis backends block on
+    file or socket I/O, so they run on a worker thread; the in-process
+    ``TTLCache`` is called directly.
+    """
+    if result_cache.backend == "memory":
+        return fn(*args, **kwargs)
+    return await anyio.to_thread.run_sync(functools.partial(fn, *args, **kwargs))
+
+
+async def _compress(body: bytes, encoding: str) -> bytes:
+    """``compress`` for a response; large bodies (batch lookups) run off the event loop."""
+    if len(body) < settings.compression_thread_min_bytes:
+        return compress(body, encoding)
+    return await anyio.to_thread.run_sync(compress, body, encoding)
+
+
+async def _encoded_response(body: bytes, headers: dict[str, str] | None, encoding: str | None, cache_key: tuple | None = None) -> Response:
+    """
+    Send ``body`` in the negotiated content coding. With a ``cache_key`` the
+    compressed form is cached next to the identity body, so later hits for
+    the same coding skip compression.
+    """
+    if encoding is None or not should_compress(body):
+        return _json_response(body, encoded_headers(headers, None))
+    encoded = await _compress(body, encoding)
+    if cache_key is not None:
+        await _cache_call(result_cache.set, (*cache_key, encoding), encoded)
+    return _json_response(encoded, encoded_headers(headers, encoding))
+
+
+async def _cached_response(cache_key: tuple, build, headers: dict[str, str] | None, encoding: str | None) -> Response:
+    """
+    Serve a versioned result-cache entry, running ``build()`` (once, for all
+    waiters) on a miss; the caller that runs it also stores the body. Each
+    request counts as one cache lookup: a miss on the compressed variant
+    (cold, or a body too small to compress) is left uncounted because the
+    identity lookup after it decides the outcome.
+    """
+    if encoding is not None:
+        encoded = await _cache_call(result_cache.get, (*cache_key, encoding), count_miss=False)
+        if encoded is not None:
+            return _json_response(encoded, encoded_headers(headers, encoding))
+
+    async def build_and_store() -> bytes:
+        body = await build()
+        await _cache_call(result_cache.set, cache_key, body)
+        return body
+
+    body = await _cache_call(result_cache.get, cache_key)
+    if body is None:
+        body = await build_flight.do(cache_key, build_and_store)
+    return await _encoded_response(body, headers, encoding, cache_key)
+
+
+# Result cache keys are ``(name, dataset_version, *normalized params)``, so a
+# refresh makes every older entry unreachable. Values are encoded bytes.
+_VERSION_UNAVAILABLE = object()
+
+
+async def _dataset_version():
+    """Current dataset_version, or _VERSION_UNAVAILABLE if it can't be read."""
+    try:
+        return await run_db(dataset.version)
+    except OperationalError:
+        logger.warning("Could not read dataset_version", exc_info=True)
+        return _VERSION_UNAVAILABLE
+
+
+async def _geocode(address: str) -> dict:
+    key = " ".join(address.split()).casefold()
+    return await geocode_flight.do(key, lambda: geocode_oneline(address))
+
+
+# Result-cache key prefixes; bump one when its cached body format changes.
+CLOSEST_KEY_PREFIX = "closest_v8"
+CLOSEST_COORDS_KEY_PREFIX = "closest_coords_v6"
+
+
+def _closest_cache_key(prefix: str, dataset_version, lat: float, lon: float, units: str, top_n: int, start_year: int, end_year: int, geometry: dict | None) -> tuple:
+    """Cached closest-tornado body for a point, rounded to ~11 m."""
+    return (prefix, dataset_version, round(lat, 4), round(lon, 4), units, top_n, start_year, end_year, _geometry_key(geometry))
+
+
+def _unversioned(cache_key: tuple) -> tuple:
+    return (cache_key[0], *cache_key[2:])
+
+
+def _on_dataset_change(version: str | None) -> None:
+    """
+    Every worker sees a new dataset_version through polling, not only the one
+    that ran the refresh. With the memory engine its track index is stale
+    until reloaded, so lookups go to PostGIS until then, and the reload
+    finishes before re-warming stores bodies under the new version.
+    """
+    global track_index
+    if settings.query_engine == "memory":
+        track_index = None
+    threading.Thread(target=_reload_for_version, args=(version,), name="cache-rewarm", daemon=True).start()
+
+
+def _reload_for_version(version: str | None) -> None:
+    _load_track_index()
+    if settings.cache_rewarm_top_n > 0:
+        _rewarm_cache(version)
+
+
+def _rewarm_cache(version: str | None) -> int:
+    """
+    Drop entries from older dataset versions, then rebuild the most
+    requested ones for ``version`` so hot lookups stay warm after a refresh.
+    """
+    global _rewarmed_version
+    with _rewarm_lock:
+        if _rewarmed_version == version:
+            return 0
+        _rewarmed_version = version
+
+    purged = result_cache.purge(lambda key: len(key) > 1 and key[1] != version)
+    if cell_cache is not None:
+        cell_cache.purge(lambda key: key[1] != version)
+    tile_store.purge(lambda key: key[1] != version)
+    warmed = 0
+    for key, build_args in hot_keys.top(settings.cache_rewarm_top_n):
+        try:
+            cache_key = (key[0], version, *key[1:])
+            body = _render_response(**build_args)
+            result_cache.set(cache_key, body)
+            if should_compress(body):
+                for encoding in ENCODINGS:
+                    result_cache.set((*cache_key, encoding), compress(body, encoding))
+            warmed += 1
+        except Exception:
+            logger.warning("Re-warming %s failed", key, exc_info=True)
+    logger.info("Dataset %s: purged %d cached results, re-warmed %d", version, purged, warmed)
+    return warmed
 
 
 @app.post("/closest-tornado", response_model=ClosestTornadoResponse)
@@ -220,7 +751,7 @@ async def closest_tornado(req: ClosestTornadoRequest, request: Request):
         raise HTTPException(status_code=429, detail="Too many requests. Please try again shortly.")
 
     try:
-        g = await geocode_oneline(req.address)
+        g = await _geocode(req.address)
     except NoGeocodeMatchError:
         raise HTTPException(status_code=400, detail="No geocoding match found for that input.")
     except GeocoderUnavailableError:
@@ -230,32 +761,66 @@ async def closest_tornado(req: ClosestTornadoRequest, request: Request):
         raise HTTPException(status_code=500, detail="Unexpected error while geocoding.")
 
     lat, lon = g["lat"], g["lon"]
+    build_args = {
+        "lat": lat,
+        "lon": lon,
+        "provider": g.get("provider", "unknown"),
+        "match_type": g.get("match_type"),
+        "units": req.units,
+        "host_url": str(request.base_url).rstrip("/"),
+        "top_n": req.top_n,
+        "start_year": req.start_year,
+        "end_year": req.end_year,
+        "geometry": req.geometry_options(),
+    }
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    dataset_version = None if req.debug else await _dataset_version()
+    if req.debug or dataset_version is _VERSION_UNAVAILABLE:
+        return await _encoded_response(await run_db(_render_response, **build_args, debug=req.debug), None, encoding)
 
+    cache_key = _closest_cache_key(CLOSEST_KEY_PREFIX, dataset_version, lat, lon, req.units, req.top_n, req.start_year, req.end_year, build_args["geometry"])
+    hot_keys.record(_unversioned(cache_key), build_args)
+    return await _cached_response(cache_key, lambda: run_db(_render_response, **build_args), None, encoding)
 
-    lat_r = round(lat, 4)
-    lon_r = round(lon, 4)
-    cache_key = ("closest_v5", lat_r, lon_r, req.units, req.top_n, req.start_year, req.end_year)
-    cached = result_cache.get(cache_key)
-    if cached is not None:
-        return cached
-
-    response = _build_response(
-        lat=lat,
-        lon=lon,
-        provider=g.get("provider", "unknown"),
-        match_type=g.get("match_type"),
-        units=req.units,
-        host_url=str(request.base_url).rstrip("/"),
-        top_n=req.top_n,
-        start_year=req.start_year,
-        end_year=req.end_year,
-    )
-    result_cache.set(cache_key, response)
-    return response
+
+def _resolve_year_range(start_year: int, end_year: int | None) -> int:
+    """Validate a query-string year range and return the effective end year."""
+    current_year = _current_year()
+    if start_year > current_year:
+        raise HTTPException(status_code=422, detail=f"start_year must be less than or equal to {current_year}")
+    if end_year is None:
+        end_year = current_year
+    if end_year > current_year:
+        raise HTTPException(status_code=422, detail=f"end_year must be less than or equal to {current_year}")
+    if end_year < start_year:
+        raise HTTPException(status_code=422, detail="end_year must be greater than or equal to start_year")
+    return end_year
+
+
+def _etag(dataset_version: str | None, *parts) -> str:
+    """Weak ETag over the dataset revision and the normalized request."""
+    digest = hashlib.sha256(json.dumps([dataset_version, *parts], default=str).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _cache_headers(etag: str) -> dict[str, str]:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.http_cache_max_age}, stale-while-revalidate={settings.http_cache_stale_while_revalidate}",
+    }
 
 
 @app.get("/closest-tornado-by-coords", response_model=ClosestTornadoResponse)
-def closest_tornado_by_coords(
+async def closest_tornado_by_coords(
     request: Request,
     lat: float = Query(..., ge=-90, le=90),
     lon: float = Query(..., ge=-180, le=180),
@@ -263,44 +828,469 @@ def closest_tornado_by_coords(
     top_n: Literal[5, 10, 15] = Query(5),
     start_year: int = Query(1950, ge=1950),
     end_year: int | None = Query(None, ge=1950),
+    precision: int | None = Query(None, ge=0, le=15),
+    corridor_segments: int | None = Query(None, ge=1, le=32),
+    simplify_m: float | None = Query(None, gt=0, le=10000),
+    geometry_format: Literal["geojson", "polyline"] = Query("geojson"),
+    debug: bool = Query(False),
+    if_none_match: str | None = Header(default=None),
+):
+    end_year = _resolve_year_range(start_year, end_year)
+    try:
+        geometry = GeometryOptions(
+            precision=precision, corridor_segments=corridor_segments, simplify_m=simplify_m, geometry_format=geometry_format
+        ).geometry_options()
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors(include_url=False))
+    lat_r = round(lat, 4)
+    lon_r = round(lon, 4)
+    host_url = str(request.base_url).rstrip("/")
+
+    # Share-link responses only change with the dataset, so a revalidation
+    # is answered before rate limiting or any query work.
+    headers = {}
+    dataset_version = None
+    if not debug:
+        dataset_version = await _dataset_version()
+        if dataset_version is not _VERSION_UNAVAILABLE:
+            headers = _cache_headers(_etag(dataset_version, host_url, lat_r, lon_r, units, top_n, start_year, end_year, _geometry_key(geometry)))
+            if _etag_matches(if_none_match, headers["ETag"]):
+                return Response(status_code=304, headers=encoded_headers(headers, None))
+
+    client_ip = request.client.host if request.client else "unknown"
+    if not rate_limiter.allow(client_ip):
+        raise HTTPException(status_code=429, detail="Too many requests. Please try again shortly.")
+
+    build_args = {
+        "lat": lat,
+        "lon": lon,
+        "provider": "shared_link",
+        "match_type": None,
+        "units": units,
+        "host_url": host_url,
+        "top_n": top_n,
+        "start_year": start_year,
+        "end_year": end_year,
+        "geometry": geometry,
+    }
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    if debug or dataset_version is _VERSION_UNAVAILABLE:
+        body = await run_db(_render_response, **build_args, debug=debug)
+        return await _encoded_response(body, {"Cache-Control": "no-store"} if debug else None, encoding)
+
+    # Keyed on the version the ETag was built from, so a body cached before
+    # a refresh is never served under the new ETag.
+    cache_key = _closest_cache_key(CLOSEST_COORDS_KEY_PREFIX, dataset_version, lat, lon, units, top_n, start_year, end_year, geometry)
+    hot_keys.record(_unversioned(cache_key), build_args)
+    return await _cached_response(cache_key, lambda: run_db(_render_response, **build_args), headers, encoding)
+
+
+@app.get("/tiles/{z}/{x}/{y}.mvt")
+async def track_tile(
+    request: Request,
+    z: int = Path(..., ge=0),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    start_year: int = Query(1950, ge=1950),
+    end_year: int | None = Query(None, ge=1950),
+    f_scale: str | None = Query(None, pattern="^[0-5](,[0-5])*$", description="Comma-separated F/EF ratings, e.g. 3,4,5"),
+    if_none_match: str | None = Header(default=None),
 ):
+    """
+    Filtered tiles (a year range or ratings) stop at ``tile_filtered_max_zoom``;
+    clients overzoom past it. Tiles not already in the per-process cache count
+    against the rate limit.
+    """
+    end_year = _resolve_year_range(start_year, end_year)
+    ratings = tuple(sorted({int(r) for r in f_scale.split(",")})) if f_scale else None
+    max_zoom = settings.tile_filtered_max_zoom if TileStore.is_filtered(start_year, end_year, ratings) else settings.tile_max_zoom
+    if z > max_zoom or x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=404, detail="Tile out of range.")
+
+    headers = {}
+    dataset_version = await _dataset_version()
+    if dataset_version is not _VERSION_UNAVAILABLE:
+        headers = _cache_headers(_etag(dataset_version, "tile", z, x, y, start_year, end_year, ratings))
+        if _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+    if dataset_version is _VERSION_UNAVAILABLE or not tile_store.cached(dataset_version, z, x, y, start_year, end_year, ratings):
+        client_ip = request.client.host if request.client else "unknown"
+        if not rate_limiter.allow(client_ip):
+            raise HTTPException(status_code=429, detail="Too many requests. Please try again shortly.")
+
+    if dataset_version is _VERSION_UNAVAILABLE:
+        tile = await run_db(tile_store.generate, z, x, y, start_year, end_year, ratings)
+    else:
+        key = ("tile", dataset_version, z, x, y, start_year, end_year, ratings)
+        tile = await build_flight.do(key, lambda: run_db(tile_store.get, dataset_version, z, x, y, start_year, end_year, ratings))
+    if not tile:
+        return Response(status_code=204, headers=headers)
+    return Response(content=tile, media_type=TILE_MEDIA_TYPE, headers=headers)
+
+
+def _render_density(window: tuple, start_year: int, end_year: int, ratings: tuple | None) -> bytes:
+    rows = _fetch_rows(DENSITY_WINDOW_SQL, window_params(window, start_year, end_year, ratings), name="density")
+    return orjson.dumps(density_payload(rows, window), option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+@app.get("/density")
+async def density(
+    request: Request,
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    start_year: int = Query(1950, ge=1950),
+    end_year: int | None = Query(None, ge=1950),
+    f_scale: str | None = Query(None, pattern="^[0-5](,[0-5])*$", description="Comma-separated F/EF ratings, e.g. 3,4,5"),
+    if_none_match: str | None = Header(default=None),
+):
+    """Touchdown counts per 0.1 degree cell over a lat/lon window, from the precomputed grid."""
+    if north <= south or east <= west:
+        raise HTTPException(status_code=422, detail="Window must have north > south and east > west.")
+    end_year = _resolve_year_range(start_year, end_year)
+    window = cell_window(south, west, north, east)
+    rows_n, cols_n = window_shape(window)
+    if rows_n * cols_n > settings.density_max_cells:
+        raise HTTPException(status_code=422, detail=f"Window covers {rows_n * cols_n} cells; the limit is {settings.density_max_cells}.")
+    ratings = tuple(sorted({int(r) for r in f_scale.split(",")})) if f_scale else None
+
+    headers = {}
+    dataset_version = await _dataset_version()
+    if dataset_version is not _VERSION_UNAVAILABLE:
+        headers = _cache_headers(_etag(dataset_version, "density", window, start_year, end_year, ratings))
+        if _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=encoded_headers(headers, None))
+
     client_ip = request.client.host if request.client else "unknown"
     if not rate_limiter.allow(client_ip):
         raise HTTPException(status_code=429, detail="Too many requests. Please try again shortly.")
 
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    if dataset_version is _VERSION_UNAVAILABLE:
+        return await _encoded_response(await run_db(_render_density, window, start_year, end_year, ratings), None, encoding)
 
-    current_year = _current_year()
-    if start_year > current_year:
-        raise HTTPException(status_code=422, detail=f"start_year must be less than or equal to {current_year}")
-    if end_year is None:
-        end_year = current_year
-    if end_year > current_year:
-        raise HTTPException(status_code=422, detail=f"end_year must be less than or equal to {current_year}")
+    cache_key = ("density_v1", dataset_version, *window, start_year, end_year, ratings)
+    return await _cached_response(cache_key, lambda: run_db(_render_density, window, start_year, end_year, ratings), headers, encoding)
+
+
+UNIT_METRES = {"miles": 1609.344, "km": 1000.0}
+
+
+def _render_within_page(params: dict, units: str, query: dict) -> bytes:
+    page_size = params["limit"]
+    rows = _fetch_rows(WITHIN_SQL, {**params, "limit": page_size + 1}, name="within")
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_cursor(rows[-1]["primary_m"], rows[-1]["event_id"]) if more else None
+    return orjson.dumps({
+        "query": query,
+        "count": len(rows),
+        "results": [_serialize_row(row, units, raw_geometry=True) for row in rows],
+        "next_cursor": next_cursor,
+    })
+
+
+def _open_stream(sql, params: dict, batch_size: int):
+    """
+    ``sql`` executed with a server-side cursor, with ``_read``'s routing: a
+    healthy replica, else the primary, and a replica that fails to connect
+    or execute is marked down and the primary used instead. Returns
+    ``(conn, result)``; the caller closes ``conn``.
+    """
+    def execute(eng):
+        conn = eng.connect()
+        try:
+            return conn, conn.execution_options(stream_results=True, yield_per=batch_size).execute(sql, params)
+        except BaseException:
+            conn.close()
+            raise
+
+    replica = replica_router.replica()
+    if replica is not None:
+        try:
+            return execute(replica)
+        except OperationalError:
+            logger.warning("Read replica failed; retrying on primary", exc_info=True)
+            replica_router.mark_down(replica)
+    return execute(engine)
+
+
+def _iter_within_rows(params: dict):
+    """Batches of rows from a server-side cursor, STREAM_BATCH_SIZE at a time."""
+    conn, result = _open_stream(WITHIN_SQL, params, STREAM_BATCH_SIZE)
+    with conn:
+        yield from result.mappings().partitions(STREAM_BATCH_SIZE)
+
+
+async def _stream_within(params: dict, units: str):
+    """
+    NDJSON lines for every row. The stream holds one ``db_limiter`` token
+    (its pooled connection) until it ends, and at most
+    ``stream_max_concurrent`` streams run at once, so slow readers cannot
+    drain the pool that ``run_db`` is sized against.
+    """
+    async with stream_limiter, db_limiter:
+        batches = _iter_within_rows(params)
+        try:
+            while True:
+                # The token above covers this thread's connection use.
+                batch = await anyio.to_thread.run_sync(next, batches, None)
+                if batch is None:
+                    return
+                yield b"".join(orjson.dumps(_serialize_row(row, units, raw_geometry=True)) + b"\n" for row in batch)
+        finally:
+            await anyio.to_thread.run_sync(batches.close)
+
+
+@app.get("/tornadoes-within")
+async def tornadoes_within(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(..., gt=0, le=500, description="In the selected units"),
+    units: str = Query("miles", pattern="^(miles|km)$"),
+    start_year: int = Query(1950, ge=1950),
+    end_year: int | None = Query(None, ge=1950),
+    limit: int = Query(100, ge=1, le=1000, description="Page size (json format)"),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    format: Literal["json", "ndjson"] = Query("json"),
+    include_geometry: bool = Query(False),
+):
+    """
+    Every tornado whose damage-path edge (or centerline, without a width) is
+    within ``radius`` of the point, nearest first. ``json`` pages with
+    ``next_cursor``; ``ndjson`` streams every remaining row, one per line.
+    """
+    end_year = _resolve_year_range(start_year, end_year)
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid cursor.")
+
+    client_ip = request.client.host if request.client else "unknown"
+    if not rate_limiter.allow(client_ip):
+        raise HTTPException(status_code=429, detail="Too many requests. Please try again shortly.")
+
+    radius_m = radius * UNIT_METRES[units]
+    if format == "ndjson":
+        params = within_params(lat, lon, radius_m, start_year, end_year, after, None, include_geometry)
+        return StreamingResponse(_stream_within(params, units), media_type="application/x-ndjson")
+
+    params = within_params(lat, lon, radius_m, start_year, end_year, after, limit, include_geometry)
+    query = {"lat": lat, "lon": lon, "radius": radius, "units": units, "start_year": start_year, "end_year": end_year}
+    body = await run_db(_render_within_page, params, units, query)
+    return await _encoded_response(body, None, negotiate(request.headers.get("accept-encoding")))
+
+
+def _exposure_summaries(points: list[tuple[float, float]], start_year: int, end_year: int) -> list[dict]:
+    """One exposure summary per point, from one candidate scan per chunk of points."""
+    if track_index is not None:
+        return [summarize(lat, lon, index_candidates(track_index, lat, lon, start_year, end_year)) for lat, lon in points]
+
+    out = []
+    for offset in range(0, len(points), BATCH_CHUNK_SIZE):
+        chunk = points[offset:offset + BATCH_CHUNK_SIZE]
+        params = {
+            "point_ids": list(range(len(chunk))),
+            "lats": [lat for lat, _ in chunk],
+            "lons": [lon for _, lon in chunk],
+            "max_radius_m": MAX_RADIUS_M,
+            "start_year": start_year,
+            "end_year": end_year,
+        }
+        rows = _fetch_rows(EXPOSURE_SQL, params, name="exposure")
+        for (lat, lon), point_rows in zip(chunk, group_by_point(rows, len(chunk))):
+            out.append(summarize(lat, lon, candidate_arrays(point_rows)))
+    return out
+
+
+def _render_exposure(points: list[tuple[float, float]], start_year: int, end_year: int, batch: bool) -> bytes:
+    results = _exposure_summaries(points, start_year, end_year)
+    payload = {"start_year": start_year, "end_year": end_year}
+    if batch:
+        payload["results"] = results
+    else:
+        payload.update(results[0])
+    return orjson.dumps(payload)
+
+
+@app.get("/exposure")
+async def exposure(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    start_year: int = Query(1950, ge=1950),
+    end_year: int | None = Query(None, ge=1950),
+    if_none_match: str | None = Header(default=None),
+):
+    """Counts, strongest rating, counts by decade and track length within 1/5/10/25 miles."""
+    end_year = _resolve_year_range(start_year, end_year)
     lat_r = round(lat, 4)
     lon_r = round(lon, 4)
-    if end_year < start_year:
-        raise HTTPException(status_code=422, detail="end_year must be greater than or equal to start_year")
 
-    cache_key = ("closest_coords_v3", lat_r, lon_r, units, top_n, start_year, end_year)
-    cached = result_cache.get(cache_key)
-    if cached is not None:
-        return cached
-
-    response = _build_response(
-        lat=lat,
-        lon=lon,
-        provider="shared_link",
-        match_type=None,
-        units=units,
-        host_url=str(request.base_url).rstrip("/"),
-        top_n=top_n,
-        start_year=start_year,
-        end_year=end_year,
-    )
-    result_cache.set(cache_key, response)
+    headers = {}
+    dataset_version = await _dataset_version()
+    if dataset_version is not _VERSION_UNAVAILABLE:
+        headers = _cache_headers(_etag(dataset_version, "exposure", lat_r, lon_r, start_year, end_year))
+        if _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=encoded_headers(headers, None))
+
+    client_ip = request.client.host if request.client else "unknown"
+    if not rate_limiter.allow(client_ip):
+        raise HTTPException(status_code=429, detail="Too many requests. Please try again shortly.")
+
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    if dataset_version is _VERSION_UNAVAILABLE:
+        return await _encoded_response(await run_db(_render_exposure, [(lat, lon)], start_year, end_year, False), None, encoding)
+    cache_key = ("exposure_v1", dataset_version, lat_r, lon_r, start_year, end_year)
+    return await _cached_response(cache_key, lambda: run_db(_render_exposure, [(lat, lon)], start_year, end_year, False), headers, encoding)
+
+
+@app.post("/exposure/batch")
+async def exposure_batch(req: ExposureBatchRequest, request: Request):
+    client_ip = request.client.host if request.client else "unknown"
+    if not rate_limiter.allow(client_ip):
+        raise HTTPException(status_code=429, detail="Too many requests. Please try again shortly.")
+
+    points = [(p.lat, p.lon) for p in req.points]
+    body = await run_db(_render_exposure, points, req.start_year, req.end_year, True)
+    return await _encoded_response(body, None, negotiate(request.headers.get("accept-encoding")))
+
+
+@app.post("/closest-tornado/batch", response_model=BatchClosestTornadoResponse)
+async def closest_tornado_batch(req: BatchClosestTornadoRequest, request: Request):
+    client_ip = request.client.host if request.client else "unknown"
+    if not rate_limiter.allow(client_ip):
+        raise HTTPException(status_code=429, detail="Too many requests. Please try again shortly.")
+
+    return await run_db(_build_batch_response, req)
+
+
+def _build_batch_response(req: BatchClosestTornadoRequest) -> dict:
+    points = [(p.lat, p.lon) for p in req.points]
+    per_point = _query_top_rows_batch(points, limit=req.top_n, start_year=req.start_year, end_year=req.end_year)
+    geometry = req.geometry_options()
+    response = {
+        "results": [
+            {
+                "query": {"lat": lat, "lon": lon},
+                "top_results": [_serialize_row(row, req.units, geometry=geometry) for row in rows],
+            }
+            for (lat, lon), rows in zip(points, per_point)
+        ],
+    }
+    if geometry_meta := _geometry_meta(geometry):
+        response["geometry"] = geometry_meta
     return response
 
 
+@app.post("/closest-tornado/shape", response_model=ShapeClosestTornadoResponse)
+async def closest_tornado_shape(req: ShapeClosestTornadoRequest, request: Request):
+    """Nearest tracks to a GeoJSON LineString or Polygon, with an ``intersects`` flag per track."""
+    client_ip = request.client.host if request.client else "unknown"
+    if not rate_limiter.allow(client_ip):
+        raise HTTPException(status_code=429, detail="Too many requests. Please try again shortly.")
+
+    return await run_db(_build_shape_response, req)
+
+
+def _build_shape_response(req: ShapeClosestTornadoRequest) -> dict:
+    shape = req.geometry
+    try:
+        rows = _query_shape_rows(shape.model_dump(), limit=req.top_n, start_year=req.start_year, end_year=req.end_year)
+    except (DataError, InternalError):
+        # PostGIS could not build or subdivide the input geometry.
+        logger.warning("Shape lookup failed for a %s input", shape.type, exc_info=True)
+        raise HTTPException(status_code=422, detail="Geometry could not be processed; check that it is valid.")
+    if not rows:
+        raise HTTPException(status_code=404, detail="No tornado data loaded.")
+
+    geometry = req.geometry_options()
+    top_results = [{**_serialize_row(row, req.units, geometry=geometry), "intersects": bool(row["intersects"])} for row in rows]
+    rings = [shape.coordinates] if shape.type == "LineString" else shape.coordinates
+    response = {
+        "query": {"type": shape.type, "positions": sum(len(ring) for ring in rings), "bbox": shape.bbox()},
+        "result": top_results[0],
+        "top_results": top_results,
+    }
+    if geometry_meta := _geometry_meta(geometry):
+        response["geometry"] = geometry_meta
+    if req.debug:
+        response["debug"] = rows.stats
+    return response
+
+
+async def _lookup_address_for_job(address: str, options: dict) -> dict:
+    g = await _geocode(address)
+    rows = await run_db(
+        _query_top_rows,
+        g["lat"],
+        g["lon"],
+        limit=options["top_n"],
+        start_year=options["start_year"],
+        end_year=options["end_year"],
+    )
+    return {
+        "lat": g["lat"],
+        "lon": g["lon"],
+        "provider": g.get("provider", "unknown"),
+        "match_type": g.get("match_type"),
+        "top_results": [_serialize_row(row, options["units"]) for row in rows],
+    }
+
+
+job_runner = JobRunner(lookup=_lookup_address_for_job)
+JOB_ID_PATTERN = "^[0-9a-f]{32}$"
+
+
+@app.post("/jobs/addresses", status_code=202)
+async def create_address_job(
+    request: Request,
+    units: str = Query("miles", pattern="^(miles|km)$"),
+    top_n: Literal[5, 10, 15] = Query(5),
+    start_year: int = Query(1950, ge=1950),
+    end_year: int | None = Query(None, ge=1950),
+):
+    """
+    Start a bulk lookup. The request body is a CSV with an ``address`` column
+    or plain text with one address per line.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    if not rate_limiter.allow(client_ip):
+        raise HTTPException(status_code=429, detail="Too many requests. Please try again shortly.")
+
+    end_year = _resolve_year_range(start_year, end_year)
+    options = {"units": units, "top_n": top_n, "start_year": start_year, "end_year": end_year}
+    try:
+        job = await job_runner.submit(request.stream(), options)
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except EmptyUploadError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return job
+
+
+@app.get("/jobs/{job_id}")
+def address_job_status(job_id: str = Path(..., pattern=JOB_ID_PATTERN)):
+    status = job_runner.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return status
+
+
+@app.get("/jobs/{job_id}/results")
+def address_job_results(
+    job_id: str = Path(..., pattern=JOB_ID_PATTERN),
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+):
+    if not job_runner.results_path(job_id).exists():
+        raise HTTPException(status_code=404, detail="Job not found.")
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(job_runner.stream_results(job_id, format), media_type=media_type)
+
+
 @app.post("/admin/refresh-noaa")
 def refresh_noaa_data(authorization: str | None = Header(default=None)):
     expected = settings.admin_refresh_token
@@ -311,6 +1301,12 @@ def refresh_noaa_data(authorization: str | None = Header(default=None)):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     import_log = refresh_updates(start_year=1950)
+    # Re-reading the version fires the index reload and re-warm when it changed.
+    dataset.invalidate()
+    try:
+        dataset.revision()
+    except OperationalError:
+        logger.warning("Could not re-read dataset_version after refresh", exc_info=True)
     return {
         "updated_years": len(import_log),
         "imports": import_log,
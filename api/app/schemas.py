@@ -1,28 +1,33 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Literal, Optional, Any, Dict, List
 import string
 from datetime import datetime
 
+from .geometry import MAX_POLYLINE_PRECISION
+from .shape import drop_repeated, ring_area, ring_self_intersects
 
-class ClosestTornadoRequest(BaseModel):
-    address: str = Field(..., min_length=5, max_length=200)
-    units: Literal["miles", "km"] = "miles"
-    top_n: Literal[5, 10, 15] = 5
-    start_year: int = Field(1950, ge=1950)
-    end_year: int = Field(default_factory=lambda: datetime.utcnow().year, ge=1950)
 
-    @field_validator("address")
-    @classmethod
-    def address_must_be_printable(cls, v: str) -> str:
-        v = v.strip()
-        if not v:
-            raise ValueError("Address cannot be empty.")
-        if any(ch not in string.printable for ch in v):
-            raise ValueError("Address contains non-printable characters.")
-        if "  " in v:
-            v = " ".join(v.split())
-        return v
+class GeometryOptions(BaseModel):
+    """How result geometry is written out; the defaults are full-precision GeoJSON."""
+    precision: Optional[int] = Field(None, ge=0, le=15)
+    corridor_segments: Optional[int] = Field(None, ge=1, le=32)
+    simplify_m: Optional[float] = Field(None, gt=0, le=10000)
+    geometry_format: Literal["geojson", "polyline"] = "geojson"
+
+    @model_validator(mode="after")
+    def polyline_precision_fits(self):
+        if self.geometry_format == "polyline" and self.precision is not None and self.precision > MAX_POLYLINE_PRECISION:
+            raise ValueError(f"precision must be at most {MAX_POLYLINE_PRECISION} with geometry_format=polyline")
+        return self
 
+    def geometry_options(self) -> Dict[str, Any]:
+        """The geometry options that differ from the defaults, as plain kwargs."""
+        return self.model_dump(include=set(GeometryOptions.model_fields), exclude_defaults=True)
+
+
+class YearRange(BaseModel):
+    start_year: int = Field(1950, ge=1950)
+    end_year: int = Field(default_factory=lambda: datetime.utcnow().year, ge=1950)
 
     @field_validator("start_year")
     @classmethod
@@ -44,6 +49,99 @@ class ClosestTornadoRequest(BaseModel):
         return v
 
 
+class QueryOptions(GeometryOptions, YearRange):
+    """Result options shared by every closest-tornado request body."""
+    units: Literal["miles", "km"] = "miles"
+    top_n: Literal[5, 10, 15] = 5
+
+
+class ClosestTornadoRequest(QueryOptions):
+    address: str = Field(..., min_length=5, max_length=200)
+    debug: bool = False
+
+    @field_validator("address")
+    @classmethod
+    def address_must_be_printable(cls, v: str) -> str:
+        v = v.strip()
+        if not v:
+            raise ValueError("Address cannot be empty.")
+        if any(ch not in string.printable for ch in v):
+            raise ValueError("Address contains non-printable characters.")
+        if "  " in v:
+            v = " ".join(v.split())
+        return v
+
+
+class BatchPoint(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+
+
+class BatchClosestTornadoRequest(QueryOptions):
+    points: List[BatchPoint] = Field(..., min_length=1, max_length=10000)
+
+
+# Most positions accepted in one shape (all rings together).
+MAX_SHAPE_POSITIONS = 5000
+
+
+class ShapeGeometry(BaseModel):
+    """A GeoJSON LineString or Polygon in lon/lat."""
+    type: Literal["LineString", "Polygon"]
+    coordinates: List[Any]
+
+    @field_validator("coordinates")
+    @classmethod
+    def coordinates_match_type(cls, v: List[Any], info):
+        rings = [v] if info.data.get("type") == "LineString" else v
+        minimum = 2 if info.data.get("type") == "LineString" else 4
+        positions = 0
+        for ring in rings:
+            if not isinstance(ring, list) or len(ring) < minimum:
+                raise ValueError(f"each line or ring needs at least {minimum} positions")
+            for pos in ring:
+                if not isinstance(pos, list) or len(pos) < 2 or not all(isinstance(c, (int, float)) for c in pos[:2]):
+                    raise ValueError("positions must be [lon, lat] numbers")
+                if not (-180 <= pos[0] <= 180 and -90 <= pos[1] <= 90):
+                    raise ValueError("positions must be [lon, lat] within range")
+            if minimum == 4 and ring[0][:2] != ring[-1][:2]:
+                raise ValueError("polygon rings must be closed")
+            positions += len(ring)
+        if not rings:
+            raise ValueError("polygon needs at least one ring")
+        if positions > MAX_SHAPE_POSITIONS:
+            raise ValueError(f"geometry has {positions} positions; the limit is {MAX_SHAPE_POSITIONS}")
+
+        rings = [drop_repeated(pos[:2] for pos in ring) for ring in rings]
+        if minimum == 2:
+            if len(rings[0]) < 2:
+                raise ValueError("line has zero length")
+            return rings[0]
+        for ring in rings:
+            if len(ring) < 4:
+                raise ValueError("polygon rings need at least three distinct positions")
+            if ring_area(ring) == 0.0:
+                raise ValueError("polygon rings must enclose an area")
+            if ring_self_intersects(ring):
+                raise ValueError("polygon rings must not intersect themselves")
+        return rings
+
+    def bbox(self) -> List[float]:
+        positions = self.coordinates if self.type == "LineString" else [pos for ring in self.coordinates for pos in ring]
+        lons = [p[0] for p in positions]
+        lats = [p[1] for p in positions]
+        return [min(lons), min(lats), max(lons), max(lats)]
+
+
+class ShapeClosestTornadoRequest(QueryOptions):
+    geometry: ShapeGeometry
+    debug: bool = False
+
+
+class ExposureBatchRequest(YearRange):
+    points: List[BatchPoint] = Field(..., min_length=1, max_length=10000)
+
+
 class GeocodeInfo(BaseModel):
     lat: float
     lon: float
@@ -67,9 +165,12 @@ class TornadoResult(BaseModel):
     wfo: Optional[str] = None
     tor_length_miles: Optional[float] = None
     tor_width_yards: Optional[int] = None
-    track_geojson: Dict[str, Any]
+    # Always present unless geometry_format=polyline (then see track_polyline).
+    track_geojson: Optional[Dict[str, Any]] = None
     closest_point_geojson: Dict[str, Any]
     corridor_geojson: Optional[Dict[str, Any]] = None
+    track_polyline: Optional[str] = None
+    corridor_polyline: Optional[str] = None
     notes: List[str]
     data_source: Dict[str, str]
 
@@ -79,3 +180,33 @@ class ClosestTornadoResponse(BaseModel):
     result: TornadoResult
     top_results: List[TornadoResult]
     share_url: str
+    geometry: Optional[Dict[str, Any]] = None
+    debug: Optional[Dict[str, Any]] = None
+
+
+class ShapeTornadoResult(TornadoResult):
+    intersects: bool
+
+
+class ShapeQueryInfo(BaseModel):
+    type: Literal["LineString", "Polygon"]
+    positions: int
+    bbox: List[float]
+
+
+class ShapeClosestTornadoResponse(BaseModel):
+    query: ShapeQueryInfo
+    result: ShapeTornadoResult
+    top_results: List[ShapeTornadoResult]
+    geometry: Optional[Dict[str, Any]] = None
+    debug: Optional[Dict[str, Any]] = None
+
+
+class BatchPointResult(BaseModel):
+    query: BatchPoint
+    top_results: List[TornadoResult]
+
+
+class BatchClosestTornadoResponse(BaseModel):
+    results: List[BatchPointResult]
+    geometry: Optional[Dict[str, Any]] = None
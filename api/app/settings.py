@@ -1,7 +1,78 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str
+    db_pool_size: int = 10
+    db_max_overflow: int = 5
+    # Server-side prepared statements (psycopg): executions before any
+    # statement is prepared on a connection. None prepares only the statements
+    # marked for it (the nearest-tornado query, see db.PREPARE_OPTION).
+    db_prepare_threshold: int | None = None
+    db_plan_cache_mode: Literal["auto", "force_generic_plan", "force_custom_plan"] = "auto"
+    # Fraction of queries that also run EXPLAIN ANALYZE to record planning vs
+    # execution time in /stats (prepared statements via EXECUTE). A debugging
+    # aid: each sample runs the query twice, so leave it at 0 in production.
+    query_explain_sample_rate: float = 0.0
+    # Read-only lookups go round-robin to these (comma-separated URLs);
+    # migrations, imports and job bookkeeping stay on database_url. A replica
+    # that fails a health check is skipped for replica_retry_seconds.
+    database_replica_urls: str = ""
+    replica_retry_seconds: float = 10.0
+    replica_connect_timeout_seconds: int = 2
+    # Streaming responses (NDJSON /tornadoes-within) running at once; each
+    # holds a pooled connection until its client has read everything.
+    stream_max_concurrent: int = 4
+    # How often each worker re-reads dataset_refresh_meta to notice a refresh
+    # made by another process.
+    dataset_poll_seconds: float = 15.0
+    # Result cache: "memory" is per process; "sqlite" is shared by every
+    # worker on the host and survives restarts; "redis" needs the redis package.
+    cache_backend: Literal["memory", "sqlite", "redis"] = "memory"
+    cache_sqlite_path: str = "/data/cache/results.sqlite3"
+    cache_redis_url: str | None = None
+    cache_ttl_seconds: int = 6 * 3600
+    cache_max_items: int = 5000
+    cache_max_mb: int = 256  # memory backend only
+    # After dataset_version changes, rebuild this many of the most requested
+    # entries in the background (0 disables).
+    cache_rewarm_top_n: int = 200
+    # Grid-cell candidate cache (postgis engine, see cell_cache.py): nearby
+    # lookups are refined in-process from one cached candidate set per cell.
+    # Distances then come from the spherical refinement, as with the memory engine.
+    # A cell whose fill would need a wider radius or more rows (sparse areas,
+    # offshore, short year windows) is not cached; its lookups use NEAREST_SQL.
+    cell_cache_enabled: bool = False
+    cell_cache_deg: float = 0.02
+    cell_cache_max_mb: int = 128
+    cell_cache_max_radius_m: float = 100_000.0
+    cell_cache_max_rows: int = 5000
+    # Cache-Control for dataset-versioned GET responses (share links); the
+    # ETag changes whenever dataset_version does.
+    http_cache_max_age: int = 300
+    http_cache_stale_while_revalidate: int = 86400
+    # Response compression: bodies under compression_min_bytes go out as-is;
+    # brotli is offered only when the brotli package is installed. Bodies of
+    # compression_thread_min_bytes or more are compressed on a worker thread.
+    compression_min_bytes: int = 1024
+    compression_thread_min_bytes: int = 64 * 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+    # Vector tiles (see tiles.py): zooms above tile_max_zoom are 404 (clients
+    # overzoom), or above tile_filtered_max_zoom for year/rating-filtered
+    # tiles; unfiltered tiles up to tile_store_max_zoom are kept in map_tile.
+    tile_max_zoom: int = 14
+    tile_filtered_max_zoom: int = 10
+    tile_store_max_zoom: int = 8
+    tile_cache_max_mb: int = 128
+    # Largest /density window, in 0.1 degree cells (200 x 200 = 20 x 20 degrees).
+    density_max_cells: int = 40_000
+    # Line/polygon lookups (see shape.py): the input is segmentized to edges of
+    # at most shape_segment_m and cut into pieces of at most
+    # shape_max_piece_vertices vertices (5 or more), each with its own KNN.
+    shape_segment_m: float = 5000.0
+    shape_max_piece_vertices: int = 8
     census_benchmark: str = "Public_AR_Current"
     census_vintage: str = "Current_Current"
 
@@ -10,4 +81,16 @@ class Settings(BaseSettings):
     nominatim_email: str | None = None  # optional, but recommended for identification
     admin_refresh_token: str | None = None
 
+    # "postgis" runs every lookup in the database; "memory" loads all tracks
+    # into an in-process NumPy index at startup (see track_index.py).
+    query_engine: Literal["postgis", "memory"] = "postgis"
+
+    # Bulk address jobs (see jobs.py)
+    job_dir: str = "/data/jobs"
+    job_concurrency: int = 8
+    job_max_upload_mb: int = 50
+    job_stale_seconds: int = 120
+    # Jobs (their address_job row and files) untouched for this long are deleted.
+    job_retention_hours: int = 72
+
 settings = Settings()
\ No newline at end of file
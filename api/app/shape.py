@@ -0,0 +1,211 @@
+"""
+Nearest tornadoes to a LineString or Polygon (routes, pipelines, parcels).
+
+A single KNN from a long line or a large polygon prunes badly: its bounding
+box covers most of the tracks near it. The input is therefore segmentized on
+the sphere and cut with ``ST_Subdivide`` into small pieces, and each piece
+runs its own ``<->`` KNN on the ``geog_line`` GiST index, the same LATERAL
+search ``NEAREST_SQL`` runs per point.
+
+The candidate set is every track in the first ``k`` of any piece. A track no
+piece returned is at least that piece's ``(k+1)``-th distance from every
+piece, so ``frontier_m`` is the smallest of those; ``rows_examined`` counts
+the distinct tracks the pieces returned, which is at most ``k`` only when the
+year window holds no more than ``k`` tracks. Both mean what they mean for
+``NEAREST_SQL``, so ``_search_is_complete`` and the adaptive ``k`` apply
+unchanged. Candidates are then ranked by their exact edge (or centerline)
+distance to the whole input, and ``intersects`` flags centerlines that cross
+or touch it (a track inside a polygon counts).
+
+Shape lookups always run in PostGIS, whatever the query engine. Request
+validation rejects zero-length lines and self-intersecting rings
+(``drop_repeated``, ``ring_self_intersects``); ``ST_MakeValid`` repairs
+whatever else PostGIS would not subdivide, such as holes crossing a shell.
+"""
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import orjson
+from sqlalchemy import text
+
+SHAPE_NEAREST_SQL = text("""
+WITH shape AS (
+  SELECT i.geom, i.geom::geography AS geog
+  FROM (SELECT ST_MakeValid(ST_SetSRID(ST_GeomFromGeoJSON(:geojson), 4326)) AS geom) i
+),
+pieces AS (
+  SELECT ROW_NUMBER() OVER () AS piece_id, p.geom::geography AS geog
+  FROM shape
+  CROSS JOIN LATERAL ST_Subdivide(
+    ST_Segmentize(shape.geog, :segment_m)::geometry,
+    :max_vertices
+  ) AS p(geom)
+),
+knn AS (
+  SELECT
+    pieces.piece_id,
+    n.event_id,
+    ROW_NUMBER() OVER (PARTITION BY pieces.piece_id ORDER BY n.knn_m) AS knn_rank,
+    MAX(n.knn_m) OVER (PARTITION BY pieces.piece_id) AS piece_frontier_m
+  FROM pieces
+  CROSS JOIN LATERAL (
+    SELECT t.event_id, t.geog_line <-> pieces.geog AS knn_m
+    FROM tornado_event t
+    WHERE t.begin_year BETWEEN CAST(:start_year AS integer) AND CAST(:end_year AS integer)
+    ORDER BY t.geog_line <-> pieces.geog
+    LIMIT :k + 1
+  ) n
+),
+search AS (
+  SELECT
+    COUNT(DISTINCT event_id) AS rows_examined,
+    MIN(piece_frontier_m) AS frontier_m,
+    COUNT(DISTINCT piece_id) AS pieces
+  FROM knn
+),
+scored AS (
+  SELECT
+    c.event_id,
+    d.center_m,
+    CASE
+      WHEN t.tor_width_yards IS NULL THEN NULL
+      ELSE GREATEST(0, d.center_m - ((t.tor_width_yards * 0.9144) / 2.0))
+    END AS edge_m,
+    ST_Intersects(t.geom_line, shape.geom) AS intersects
+  FROM (SELECT DISTINCT event_id FROM knn WHERE knn_rank <= :k) c
+  JOIN tornado_event t ON t.event_id = c.event_id
+  CROSS JOIN shape
+  CROSS JOIN LATERAL (
+    SELECT ST_Distance(t.geog_line, shape.geog) AS center_m
+  ) d
+),
+best AS (
+  SELECT s.*, COALESCE(s.edge_m, s.center_m) AS primary_m
+  FROM scored s
+  ORDER BY primary_m ASC, s.event_id ASC
+  LIMIT :limit
+)
+SELECT
+  t.event_id, t.begin_dt, t.end_dt, t.state, t.cz_name, t.wfo,
+  t.tor_f_scale, t.tor_length_miles, t.tor_width_yards,
+  best.center_m,
+  best.edge_m,
+  best.primary_m,
+  best.intersects,
+  COALESCE(t.track_geojson, ST_AsGeoJSON(t.geom_line)) AS track_geojson,
+  ST_AsGeoJSON(ST_ClosestPoint(t.geom_line, shape.geom)) AS closest_pt_geojson,
+  CASE
+    WHEN t.tor_width_yards IS NULL THEN NULL
+    ELSE COALESCE(
+      t.corridor_geojson,
+      ST_AsGeoJSON(
+        ST_Buffer(
+          t.geog_line,
+          (t.tor_width_yards * 0.9144) / 2.0,
+          'endcap=round join=round'
+        )::geometry
+      )
+    )
+  END AS corridor_geojson,
+  search.rows_examined,
+  search.frontier_m,
+  search.pieces,
+  mhw.max_half_width_m
+FROM best
+JOIN tornado_event t ON t.event_id = best.event_id
+CROSS JOIN shape
+CROSS JOIN search
+CROSS JOIN (
+  SELECT MAX(tor_width_yards) * 0.9144 / 2.0 AS max_half_width_m
+  FROM tornado_event
+) mhw
+ORDER BY best.primary_m ASC, best.event_id ASC;
+""")
+
+
+def shape_params(
+    geometry: Dict[str, Any],
+    limit: int,
+    k: int,
+    start_year: int,
+    end_year: int,
+    segment_m: float,
+    max_vertices: int,
+) -> Dict[str, Any]:
+    return {
+        "geojson": orjson.dumps({"type": geometry["type"], "coordinates": geometry["coordinates"]}).decode(),
+        "limit": limit,
+        "k": k,
+        "start_year": start_year,
+        "end_year": end_year,
+        "segment_m": segment_m,
+        "max_vertices": max_vertices,
+    }
+
+
+def drop_repeated(positions: Sequence[Sequence[float]]) -> List[List[float]]:
+    """``positions`` without consecutive duplicates."""
+    out: List[List[float]] = []
+    for pos in positions:
+        if not out or list(pos) != out[-1]:
+            out.append(list(pos))
+    return out
+
+
+# Edge pairs tested per NumPy pass in ``ring_self_intersects``.
+_PAIR_CHUNK = 1_000_000
+
+
+def _orientation(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    return np.sign((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]))
+
+
+def _edges_meet(a: np.ndarray, b: np.ndarray, c: np.ndarray, d: np.ndarray) -> bool:
+    """Whether any edge ``a[k]-b[k]`` crosses or touches ``c[k]-d[k]``; the boxes already overlap."""
+    o1, o2 = _orientation(a, b, c), _orientation(a, b, d)
+    o3, o4 = _orientation(c, d, a), _orientation(c, d, b)
+    # Collinear edges pass the sign test, and their overlapping boxes mean they meet.
+    return bool(np.any((o1 * o2 <= 0) & (o3 * o4 <= 0)))
+
+
+def ring_self_intersects(ring: Sequence[Sequence[float]]) -> bool:
+    """
+    True when two non-adjacent edges of a closed ring (without repeated
+    positions) cross or touch, as in a bow-tie. Planar in lon/lat. A sweep
+    over edges sorted by west edge pairs up only those whose boxes overlap,
+    so typical rings cost a few NumPy passes, not n^2 tests.
+    """
+    p = np.asarray(ring, dtype=np.float64)
+    a, b = p[:-1], p[1:]
+    n = len(a)
+    if n < 4:
+        return False
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    order = np.argsort(lo[:, 0], kind="stable")
+    ends = np.searchsorted(lo[order, 0], hi[order, 0], side="right")
+    counts = np.maximum(ends - np.arange(1, n + 1), 0)
+
+    block_start = 0
+    cumulative = np.cumsum(counts)
+    while block_start < n:
+        base = cumulative[block_start - 1] if block_start else 0
+        block_end = max(block_start + 1, int(np.searchsorted(cumulative, base + _PAIR_CHUNK, side="right")))
+        block_counts = counts[block_start:block_end]
+        total = int(block_counts.sum())
+        if total:
+            pos = np.repeat(np.arange(block_start, block_end), block_counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(block_counts) - block_counts, block_counts)
+            i, j = order[pos], order[pos + 1 + offsets]
+            adjacent = (np.abs(i - j) == 1) | (np.minimum(i, j) == 0) & (np.maximum(i, j) == n - 1)
+            keep = ~adjacent & (lo[i, 1] <= hi[j, 1]) & (lo[j, 1] <= hi[i, 1])
+            i, j = i[keep], j[keep]
+            if i.size and _edges_meet(a[i], b[i], a[j], b[j]):
+                return True
+        block_start = block_end
+    return False
+
+
+def ring_area(ring: Sequence[Sequence[float]]) -> float:
+    """Planar (shoelace) area of a closed ring, in square degrees."""
+    p = np.asarray(ring, dtype=np.float64)
+    return abs(float(np.sum(p[:-1, 0] * p[1:, 1] - p[1:, 0] * p[:-1, 1]))) / 2.0
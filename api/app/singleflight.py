@@ -0,0 +1,39 @@
+"""
+Request coalescing for identical concurrent work.
+
+``SingleFlight.do(key, fn)`` starts ``fn()`` once per key; callers that
+arrive while it is running await the same task instead of starting their
+own. The task is shielded, so one waiter disconnecting does not cancel the
+work for the others. Nothing is kept after the task finishes; caching is
+the result cache's job.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved even if every waiter went away.
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
@@ -0,0 +1,240 @@
+"""
+Mapbox Vector Tiles of every tornado track.
+
+``/tiles/{z}/{x}/{y}.mvt`` is built by ``ST_AsMVT`` over ``tornado_event``,
+found through the ``geom_line`` GiST index. Low zooms drop tracks whose
+reported path is too short to see there, and ``ST_AsMVTGeom`` snaps the
+rest to the tile grid. Tiles are cached per process, keyed by
+dataset_version. Unfiltered tiles up to ``tile_store_max_zoom`` are also
+kept in ``map_tile``, so every worker shares them, they survive restarts and
+they can be seeded ahead of time:
+
+    python -m app.tiles --max-zoom 6
+"""
+import argparse
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import text
+
+from .guardrails import TTLCache
+from .instrumentation import query_timings
+
+TILE_LAYER = "tracks"
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+# Shortest reported path (miles) drawn at each zoom. Zooms past the table
+# keep every track.
+MIN_LENGTH_MILES_BY_ZOOM = {0: 25.0, 1: 25.0, 2: 15.0, 3: 10.0, 4: 5.0, 5: 3.0, 6: 1.0, 7: 0.5}
+
+# lon/lat box covering the lower 48, Alaska, Hawaii and Puerto Rico.
+SEED_BOUNDS = (-170.0, 17.0, -64.0, 72.0)
+
+TILE_SQL = text("""
+WITH bounds AS (
+  SELECT
+    ST_TileEnvelope(:z, :x, :y) AS env,
+    ST_Transform(ST_TileEnvelope(:z, :x, :y, margin => :margin), 4326) AS env_4326
+),
+features AS (
+  SELECT
+    t.event_id,
+    t.begin_year,
+    t.tor_f_scale,
+    t.tor_width_yards,
+    ST_AsMVTGeom(ST_Transform(t.geom_line, 3857), b.env, :extent, :buffer, true) AS geom
+  FROM tornado_event t, bounds b
+  WHERE t.geom_line && b.env_4326
+    AND t.begin_year BETWEEN :start_year AND :end_year
+    AND COALESCE(t.tor_length_miles, 0) >= :min_length_miles
+    AND (
+      CAST(:ratings AS integer[]) IS NULL
+      OR CAST(substring(t.tor_f_scale FROM '[0-9]') AS integer) = ANY(CAST(:ratings AS integer[]))
+    )
+)
+SELECT ST_AsMVT(features, :layer, :extent, 'geom') AS tile
+FROM features
+WHERE geom IS NOT NULL;
+""")
+
+SELECT_STORED_TILE_SQL = text("""
+SELECT tile
+FROM map_tile
+WHERE dataset_version = :dataset_version AND z = :z AND x = :x AND y = :y;
+""")
+
+INSERT_STORED_TILE_SQL = text("""
+INSERT INTO map_tile (dataset_version, z, x, y, tile)
+VALUES (:dataset_version, :z, :x, :y, :tile)
+ON CONFLICT (dataset_version, z, x, y) DO NOTHING;
+""")
+
+# Run by refreshes once the new dataset_version is written.
+DELETE_STALE_TILES_SQL = text("""
+DELETE FROM map_tile
+WHERE dataset_version IS DISTINCT FROM :dataset_version;
+""")
+
+
+def min_length_miles(z: int) -> float:
+    return MIN_LENGTH_MILES_BY_ZOOM.get(z, 0.0)
+
+
+def tile_range(z: int, west: float, south: float, east: float, north: float) -> Iterator[Tuple[int, int]]:
+    """Every ``(x, y)`` at zoom ``z`` that touches the lon/lat box."""
+    n = 2 ** z
+
+    def tx(lon):
+        return min(n - 1, max(0, int((lon + 180.0) / 360.0 * n)))
+
+    def ty(lat):
+        lat = max(-85.0511, min(85.0511, lat))
+        r = math.radians(lat)
+        return min(n - 1, max(0, int((1.0 - math.asinh(math.tan(r)) / math.pi) / 2.0 * n)))
+
+    for x in range(tx(west), tx(east) + 1):
+        for y in range(ty(north), ty(south) + 1):
+            yield x, y
+
+
+class TileStore:
+    """
+    Tile lookup in three tiers: the per-process LRU, then ``map_tile`` for
+    unfiltered low-zoom tiles, then ``TILE_SQL``. ``read(fn)`` runs
+    ``fn(conn)`` for tile generation (replicas are fine); ``write(fn)`` runs it
+    on the primary for ``map_tile`` inserts.
+    """
+    def __init__(
+        self,
+        read: Callable[[Callable[[Any], Any]], Any],
+        write: Callable[[Callable[[Any], Any]], Any],
+        store_max_zoom: int = 8,
+        ttl_seconds: int = 6 * 3600,
+        max_bytes: int = 128 * 1024 * 1024,
+    ):
+        self.read = read
+        self.write = write
+        self.store_max_zoom = store_max_zoom
+        self.tiles = TTLCache(ttl_seconds=ttl_seconds, max_items=1_000_000, max_bytes=max_bytes)
+        self._lock = threading.Lock()
+        self._counts = {"stored_hits": 0, "generated": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    @staticmethod
+    def is_filtered(start_year: int, end_year: int, ratings) -> bool:
+        """Anything but the full year range and every rating."""
+        return start_year != 1950 or end_year != datetime.utcnow().year or bool(ratings)
+
+    def _stored(self, z: int, start_year: int, end_year: int, ratings) -> bool:
+        return z <= self.store_max_zoom and not self.is_filtered(start_year, end_year, ratings)
+
+    def cached(self, dataset_version: Optional[str], z: int, x: int, y: int, start_year: int, end_year: int, ratings: Optional[Tuple[int, ...]] = None) -> bool:
+        """
+        Whether the tile is in the per-process LRU, so ``get`` answers without
+        a query. A ``map_tile``-tier tile may still be unseeded, in which case
+        ``get`` would run ``TILE_SQL`` and a primary-side insert, so it does not
+        count as cached until it has been served once.
+        """
+        return self.tiles.contains(("tile", dataset_version, z, x, y, start_year, end_year, ratings))
+
+    def generate(self, z: int, x: int, y: int, start_year: int, end_year: int, ratings: Optional[Tuple[int, ...]]) -> bytes:
+        params = {
+            "z": z,
+            "x": x,
+            "y": y,
+            "margin": TILE_BUFFER / TILE_EXTENT,
+            "extent": TILE_EXTENT,
+            "buffer": TILE_BUFFER,
+            "layer": TILE_LAYER,
+            "start_year": start_year,
+            "end_year": end_year,
+            "min_length_miles": min_length_miles(z),
+            "ratings": list(ratings) if ratings else None,
+        }
+        start = time.perf_counter()
+        tile = self.read(lambda conn: conn.execute(TILE_SQL, params).scalar())
+        query_timings.record("tile", (time.perf_counter() - start) * 1000.0)
+        self._count("generated")
+        return bytes(tile or b"")
+
+    def get(self, dataset_version: Optional[str], z: int, x: int, y: int, start_year: int, end_year: int, ratings: Optional[Tuple[int, ...]] = None) -> bytes:
+        key = ("tile", dataset_version, z, x, y, start_year, end_year, ratings)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            return tile
+
+        stored = self._stored(z, start_year, end_year, ratings)
+        version = dataset_version or ""
+        if stored:
+            params = {"dataset_version": version, "z": z, "x": x, "y": y}
+            tile = self.read(lambda conn: conn.execute(SELECT_STORED_TILE_SQL, params).scalar())
+            if tile is not None:
+                tile = bytes(tile)
+                self._count("stored_hits")
+                self.tiles.set(key, tile)
+                return tile
+
+        tile = self.generate(z, x, y, start_year, end_year, ratings)
+        if stored:
+            params = {"dataset_version": version, "z": z, "x": x, "y": y, "tile": tile}
+            self.write(lambda conn: conn.execute(INSERT_STORED_TILE_SQL, params))
+        self.tiles.set(key, tile)
+        return tile
+
+    def seed(self, dataset_version: Optional[str], max_zoom: int, bounds: Tuple[float, float, float, float] = SEED_BOUNDS) -> int:
+        """Fill ``map_tile`` with the unfiltered tiles up to ``max_zoom``."""
+        end_year = datetime.utcnow().year
+        count = 0
+        for z in range(0, min(max_zoom, self.store_max_zoom) + 1):
+            for x, y in tile_range(z, *bounds):
+                self.get(dataset_version, z, x, y, 1950, end_year)
+                count += 1
+        return count
+
+    def purge(self, predicate: Callable[[Tuple[Any, ...]], bool]) -> int:
+        return self.tiles.purge(predicate)
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.tiles.stats()
+        with self._lock:
+            counts = dict(self._counts)
+        served = memory.get("hits", 0) + counts["stored_hits"] + counts["generated"]
+        return {
+            **counts,
+            "memory": memory,
+            "hit_rate": round((served - counts["generated"]) / served, 4) if served else None,
+        }
+
+
+def main() -> None:
+    from .dataset import VERSION_SQL
+    from .db import engine
+    from .settings import settings
+
+    parser = argparse.ArgumentParser(description="Pre-generate unfiltered low-zoom track tiles into map_tile.")
+    parser.add_argument("--max-zoom", type=int, default=min(6, settings.tile_store_max_zoom))
+    args = parser.parse_args()
+
+    def on_primary(fn):
+        with engine.begin() as conn:
+            return fn(conn)
+
+    row = on_primary(lambda conn: conn.execute(VERSION_SQL).mappings().first())
+    version = row["dataset_version"] if row else None
+    store = TileStore(read=on_primary, write=on_primary, store_max_zoom=settings.tile_store_max_zoom)
+    start = time.perf_counter()
+    count = store.seed(version, args.max_zoom)
+    elapsed = time.perf_counter() - start
+    print(f"Seeded {count} tiles (z0-{min(args.max_zoom, settings.tile_store_max_zoom)}) for dataset_version={version} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
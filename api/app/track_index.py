@@ -0,0 +1,313 @@
+"""
+In-process nearest-track engine.
+
+Loads every tornado segment into NumPy arrays, buckets them into a coarse
+lat/lon grid and answers nearest-track queries without a PostGIS round trip.
+Distances are great-circle distances on a sphere, so they can differ from the
+spheroidal ``ST_Distance`` used by the SQL path by a few tenths of a percent.
+"""
+import json
+import math
+from typing import Any, Dict, List
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+EARTH_RADIUS_M = 6371008.8
+YARDS_TO_M = 0.9144
+GRID_DEG = 1.0
+# Great-circle arcs bulge slightly past the bounding box of their endpoints.
+GRID_PAD_DEG = 0.01
+# Past this many rings a brute-force pass over every segment is cheaper.
+MAX_RING = 12
+# PostGIS buffers use 8 segments per quarter circle by default.
+QUAD_SEGS = 8
+
+LOAD_SQL = text("""
+SELECT
+  event_id, begin_dt, end_dt, state, cz_name, wfo,
+  tor_f_scale, tor_length_miles, tor_width_yards,
+  ST_Y(ST_StartPoint(geom_line)) AS lat0,
+  ST_X(ST_StartPoint(geom_line)) AS lon0,
+  ST_Y(ST_EndPoint(geom_line)) AS lat1,
+  ST_X(ST_EndPoint(geom_line)) AS lon1
+FROM tornado_event
+WHERE begin_dt IS NOT NULL
+  AND geom_line IS NOT NULL;
+""")
+
+ROW_FIELDS = ["begin_dt", "end_dt", "state", "cz_name", "wfo", "tor_f_scale", "tor_length_miles", "tor_width_yards"]
+
+
+def f_rating(f_scale) -> int:
+    """0-5 from an F or EF scale string, -1 when unrated."""
+    for ch in f_scale or "":
+        if ch.isdigit():
+            return int(ch)
+    return -1
+
+
+def _to_xyz(lat_deg, lon_deg):
+    lat = np.radians(lat_deg)
+    lon = np.radians(lon_deg)
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _to_latlon(xyz):
+    x, y, z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+    return np.degrees(np.arctan2(z, np.hypot(x, y))), np.degrees(np.arctan2(y, x))
+
+
+def _angle_between(u, v):
+    """Angle between unit vectors, numerically stable for tiny angles."""
+    return np.arctan2(np.linalg.norm(np.cross(u, v), axis=-1), np.sum(u * v, axis=-1))
+
+
+def point_segment_distance(p, a, b, n):
+    """
+    Vectorized great-circle distance from unit vector ``p`` to arcs ``a``-``b``.
+
+    ``n`` holds the unit normals of each arc's great circle (zero rows for
+    zero-length segments). Returns ``(distance_m, closest_xyz)``.
+    """
+    da = _angle_between(a, p[None, :])
+    db = _angle_between(b, p[None, :])
+
+    pn = n @ p
+    c = p[None, :] - pn[:, None] * n
+    c_norm = np.linalg.norm(c, axis=1)
+    valid = (np.linalg.norm(n, axis=1) > 0) & (c_norm > 1e-15)
+    c = c / np.where(c_norm > 0, c_norm, 1.0)[:, None]
+
+    on_arc = (
+        valid
+        & (np.sum(np.cross(a, c) * n, axis=1) >= 0)
+        & (np.sum(np.cross(c, b) * n, axis=1) >= 0)
+    )
+    d_perp = np.arcsin(np.clip(np.abs(pn), 0.0, 1.0))
+
+    nearer_end = np.where((da <= db)[:, None], a, b)
+    dist = np.where(on_arc, d_perp, np.minimum(da, db)) * EARTH_RADIUS_M
+    closest = np.where(on_arc[:, None], c, nearer_end)
+    return dist, closest
+
+
+def _outside_window_lower_bound(lat, lon, south, north, west, east):
+    """Smallest possible distance from (lat, lon) to any point outside the box."""
+    bounds = []
+    if north < 90:
+        bounds.append(math.radians(north - lat))
+    if south > -90:
+        bounds.append(math.radians(lat - south))
+    if east - west < 360:
+        cos_lat = math.cos(math.radians(lat))
+        for dlon in (east - lon, lon - west):
+            if dlon >= 90:
+                bounds.append(math.radians(90 - abs(lat)))
+            else:
+                bounds.append(math.asin(min(1.0, math.sin(math.radians(dlon)) * cos_lat)))
+    if not bounds:
+        return math.inf
+    return max(0.0, min(bounds)) * EARTH_RADIUS_M
+
+
+def corridor_polygon(lat0, lon0, lat1, lon1, half_width_m, quad_segs=QUAD_SEGS):
+    """
+    Round-capped buffer around a segment, built in a local equirectangular
+    frame centred on the segment midpoint. Mirrors
+    ``ST_Buffer(geog, half_width, 'endcap=round join=round')`` closely enough
+    for display.
+    """
+    mid_lat = math.radians((lat0 + lat1) / 2.0)
+    mid_lon = (lon0 + lon1) / 2.0
+    kx = math.cos(mid_lat) * math.pi / 180.0 * EARTH_RADIUS_M
+    ky = math.pi / 180.0 * EARTH_RADIUS_M
+
+    ax, ay = (lon0 - mid_lon) * kx, (lat0 - math.degrees(mid_lat)) * ky
+    bx, by = (lon1 - mid_lon) * kx, (lat1 - math.degrees(mid_lat)) * ky
+    heading = math.atan2(by - ay, bx - ax) if (ax, ay) != (bx, by) else 0.0
+
+    steps = 2 * quad_segs
+    ring = []
+    # Half circle around the end point, then around the start point.
+    for cx, cy, start in ((bx, by, heading - math.pi / 2), (ax, ay, heading + math.pi / 2)):
+        for i in range(steps + 1):
+            theta = start + math.pi * i / steps
+            x = cx + half_width_m * math.cos(theta)
+            y = cy + half_width_m * math.sin(theta)
+            ring.append([mid_lon + x / kx, math.degrees(mid_lat) + y / ky])
+    ring.append(ring[0])
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+class TrackIndex:
+    """
+    Grid-bucketed NumPy arrays over every tornado segment.
+
+    ``query`` returns rows with the same keys the SQL path produces, so
+    ``_serialize_row`` can consume either.
+    """
+    def __init__(self, rows: List[Dict[str, Any]], grid_deg: float = GRID_DEG):
+        self.grid_deg = grid_deg
+        self.size = len(rows)
+        self.event_id = np.array([int(r["event_id"]) for r in rows], dtype=np.int64)
+        self.lat0 = np.array([float(r["lat0"]) for r in rows], dtype=np.float64)
+        self.lon0 = np.array([float(r["lon0"]) for r in rows], dtype=np.float64)
+        self.lat1 = np.array([float(r["lat1"]) for r in rows], dtype=np.float64)
+        self.lon1 = np.array([float(r["lon1"]) for r in rows], dtype=np.float64)
+        self.begin_year = np.array([r["begin_dt"].year if r.get("begin_dt") else -1 for r in rows], dtype=np.int32)
+        self.half_width_m = np.array(
+            [r["tor_width_yards"] * YARDS_TO_M / 2.0 if r.get("tor_width_yards") is not None else np.nan for r in rows],
+            dtype=np.float64,
+        )
+        self.max_half_width_m = float(np.nanmax(self.half_width_m)) if np.any(~np.isnan(self.half_width_m)) else 0.0
+        self.attrs = [{k: r.get(k) for k in ROW_FIELDS} for r in rows]
+        self.f_rating = np.array([f_rating(r.get("tor_f_scale")) for r in rows], dtype=np.int8)
+
+        self.a = _to_xyz(self.lat0, self.lon0).reshape(-1, 3)
+        self.b = _to_xyz(self.lat1, self.lon1).reshape(-1, 3)
+        n = np.cross(self.a, self.b)
+        n_norm = np.linalg.norm(n, axis=1)
+        self.n = np.where((n_norm > 1e-15)[:, None], n / np.where(n_norm > 0, n_norm, 1.0)[:, None], 0.0)
+
+        self.grid: Dict[tuple, np.ndarray] = {}
+        self._build_grid()
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory footprint (arrays plus per-row attributes)."""
+        arrays = (self.event_id, self.lat0, self.lon0, self.lat1, self.lon1, self.begin_year, self.half_width_m, self.f_rating, self.a, self.b, self.n)
+        return sum(a.nbytes for a in arrays) + 400 * self.size
+
+    @classmethod
+    def load(cls, engine: Engine) -> "TrackIndex":
+        with engine.begin() as conn:
+            rows = [dict(r) for r in conn.execute(LOAD_SQL).mappings()]
+        return cls(rows)
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.grid_deg), math.floor(lon / self.grid_deg)
+
+    def _build_grid(self) -> None:
+        g = self.grid_deg
+        i0 = np.floor((np.minimum(self.lat0, self.lat1) - GRID_PAD_DEG) / g).astype(int)
+        i1 = np.floor((np.maximum(self.lat0, self.lat1) + GRID_PAD_DEG) / g).astype(int)
+        j0 = np.floor((np.minimum(self.lon0, self.lon1) - GRID_PAD_DEG) / g).astype(int)
+        j1 = np.floor((np.maximum(self.lon0, self.lon1) + GRID_PAD_DEG) / g).astype(int)
+
+        buckets: Dict[tuple, list] = {}
+        for idx in range(self.size):
+            for i in range(i0[idx], i1[idx] + 1):
+                for j in range(j0[idx], j1[idx] + 1):
+                    buckets.setdefault((i, j), []).append(idx)
+        self.grid = {cell: np.array(ids, dtype=np.int64) for cell, ids in buckets.items()}
+
+    def _ring_cells(self, ci, cj, r):
+        if r == 0:
+            yield ci, cj
+            return
+        for dj in range(-r, r + 1):
+            yield ci - r, cj + dj
+            yield ci + r, cj + dj
+        for di in range(-r + 1, r):
+            yield ci + di, cj - r
+            yield ci + di, cj + r
+
+    def _score(self, p, idx):
+        center_m, closest = point_segment_distance(p, self.a[idx], self.b[idx], self.n[idx])
+        hw = self.half_width_m[idx]
+        edge_m = np.where(np.isnan(hw), np.nan, np.maximum(0.0, center_m - np.nan_to_num(hw)))
+        primary_m = np.where(np.isnan(edge_m), center_m, edge_m)
+        return center_m, edge_m, primary_m, closest
+
+    def query(self, lat: float, lon: float, limit: int = 5, start_year: int = 1950, end_year: int = 9999) -> List[Dict[str, Any]]:
+        rows, _ = self.query_with_stats(lat, lon, limit=limit, start_year=start_year, end_year=end_year)
+        return rows
+
+    def query_with_stats(self, lat, lon, limit=5, start_year=1950, end_year=9999):
+        """Like ``query`` but also returns ``{"rows_examined": ...}``."""
+        if self.size == 0:
+            return [], {"rows_examined": 0}
+
+        p = _to_xyz(np.float64(lat), np.float64(lon)).reshape(3)
+        ci, cj = self._cell(lat, lon)
+        g = self.grid_deg
+
+        picked: List[np.ndarray] = []
+        r = 0
+        while True:
+            for cell in self._ring_cells(ci, cj, r):
+                ids = self.grid.get(cell)
+                if ids is not None:
+                    picked.append(ids)
+
+            bound = _outside_window_lower_bound(lat, lon, (ci - r) * g, (ci + r + 1) * g, (cj - r) * g, (cj + r + 1) * g)
+            if r >= MAX_RING or math.isinf(bound):
+                idx = self._in_years(np.arange(self.size), start_year, end_year)
+                scores = self._score(p, idx)
+                break
+
+            idx = self._in_years(np.unique(np.concatenate(picked)) if picked else np.empty(0, dtype=np.int64), start_year, end_year)
+            if idx.size >= limit:
+                scores = self._score(p, idx)
+                kth = np.partition(scores[2], limit - 1)[limit - 1]
+                # Anything outside the visited window is at least ``bound`` from
+                # its centerline, so its edge distance is at least that minus
+                # the widest half-width in the table.
+                if kth <= bound - self.max_half_width_m:
+                    break
+            r += 1
+
+        if idx.size == 0:
+            return [], {"rows_examined": 0}
+
+        center_m, edge_m, primary_m, closest = scores
+        order = np.lexsort((self.event_id[idx], primary_m))[:limit]
+        rows = [self._row(int(idx[o]), float(center_m[o]), edge_m[o], closest[o]) for o in order]
+        return rows, {"rows_examined": int(idx.size)}
+
+    def within(self, lat: float, lon: float, radius_m: float, start_year: int = 1950, end_year: int = 9999):
+        """``(idx, center_m)`` for every segment whose centerline is within ``radius_m``."""
+        if self.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        dlat = math.degrees(radius_m / EARTH_RADIUS_M) + GRID_PAD_DEG
+        cos_lat = math.cos(math.radians(min(89.0, abs(lat) + dlat)))
+        dlon = dlat / cos_lat
+        i0, j0 = self._cell(lat - dlat, lon - dlon)
+        i1, j1 = self._cell(lat + dlat, lon + dlon)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > (2 * MAX_RING + 1) ** 2:
+            idx = np.arange(self.size)
+        else:
+            picked = [self.grid[(i, j)] for i in range(i0, i1 + 1) for j in range(j0, j1 + 1) if (i, j) in self.grid]
+            idx = np.unique(np.concatenate(picked)) if picked else np.empty(0, dtype=np.int64)
+        idx = self._in_years(idx, start_year, end_year)
+        p = _to_xyz(np.float64(lat), np.float64(lon)).reshape(3)
+        center_m, _ = point_segment_distance(p, self.a[idx], self.b[idx], self.n[idx])
+        keep = center_m <= radius_m
+        return idx[keep], center_m[keep]
+
+    def _in_years(self, idx, start_year, end_year):
+        years = self.begin_year[idx]
+        return idx[(years >= start_year) & (years <= end_year)]
+
+    def _row(self, i: int, center_m: float, edge_m, closest_xyz) -> Dict[str, Any]:
+        c_lat, c_lon = _to_latlon(closest_xyz)
+        hw = self.half_width_m[i]
+        corridor = None
+        if not np.isnan(hw):
+            corridor = json.dumps(corridor_polygon(self.lat0[i], self.lon0[i], self.lat1[i], self.lon1[i], float(hw)))
+        return {
+            "event_id": int(self.event_id[i]),
+            **self.attrs[i],
+            "center_m": center_m,
+            "edge_m": None if np.isnan(edge_m) else float(edge_m),
+            "track_geojson": json.dumps({
+                "type": "LineString",
+                "coordinates": [[self.lon0[i], self.lat0[i]], [self.lon1[i], self.lat1[i]]],
+            }),
+            "closest_pt_geojson": json.dumps({"type": "Point", "coordinates": [float(c_lon), float(c_lat)]}),
+            "corridor_geojson": corridor,
+        }
+
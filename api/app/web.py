@@ -1,12 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
 
-router = APIRouter()
+from .compression import PrecompressedBody
+from .settings import settings
 
+router = APIRouter()
 
-@router.get("/", response_class=HTMLResponse)
-def home():
-    return HTMLResponse("""
+PAGE_HTML = """
 <!doctype html>
 <html lang="en">
 <head>
@@ -160,6 +160,7 @@ def home():
         <div class="legend-row"><span class="sw-line" style="background:#3b82f6"></span>Other selected top tracks</div>
         <div class="legend-row"><span class="sw-line" style="background:#60a5fa; height:6px;"></span>Selected track</div>
         <div class="legend-row"><span class="sw-corridor"></span>Damage path corridor</div>
+        <label class="legend-row" style="margin:3px 0; cursor:pointer;"><input id="allTracks" type="checkbox" checked /><span class="sw-line" style="background:#64748b"></span>All tracks in year range</label>
       </div>
     </section>
   </div>
@@ -179,6 +180,7 @@ def home():
     const shareWrap = document.getElementById('shareWrap');
     const shareLinkEl = document.getElementById('shareLink');
     const copyBtn = document.getElementById('copyBtn');
+    const allTracks = document.getElementById('allTracks');
 
     let latestPayload = null;
     let selectedIndex = 0;
@@ -199,7 +201,91 @@ def home():
     map.addControl(new maplibregl.NavigationControl(), 'top-right');
     map.addControl(new maplibregl.ScaleControl({ maxWidth: 120, unit: 'imperial' }), 'bottom-right');
 
+    // Every historical track, as vector tiles filtered to the year sliders.
+    // The server stops filtered tiles at a lower zoom; the source's maxzoom
+    // follows it so MapLibre overzooms the last tile instead of requesting
+    // tiles that 404.
+    const TILE_MAX_ZOOM = __TILE_MAX_ZOOM__;
+    const TILE_FILTERED_MAX_ZOOM = __TILE_FILTERED_MAX_ZOOM__;
+
+    function allTracksUrl() {
+      return `${window.location.origin}/tiles/{z}/{x}/{y}.mvt?start_year=${startYear.value}&end_year=${endYear.value}`;
+    }
+
+    function allTracksMaxZoom() {
+      const filtered = Number(startYear.value) !== 1950 || Number(endYear.value) !== currentYear;
+      return filtered ? TILE_FILTERED_MAX_ZOOM : TILE_MAX_ZOOM;
+    }
 
+    function addAllTracks(beforeId) {
+      map.addSource('all-tracks', { type: 'vector', tiles: [allTracksUrl()], minzoom: 0, maxzoom: allTracksMaxZoom() });
+      map.addLayer({
+        id: 'all-tracks',
+        type: 'line',
+        source: 'all-tracks',
+        'source-layer': 'tracks',
+        layout: { visibility: allTracks.checked ? 'visible' : 'none' },
+        paint: { 'line-color': '#64748b', 'line-width': ['interpolate', ['linear'], ['zoom'], 3, 0.5, 10, 2], 'line-opacity': 0.55 }
+      }, beforeId);
+    }
+
+    map.on('load', () => addAllTracks());
+
+    function refreshAllTracks() {
+      const source = map.getSource('all-tracks');
+      if (!source) return;
+      if (source.maxzoom === allTracksMaxZoom()) {
+        source.setTiles([allTracksUrl()]);
+        return;
+      }
+      // maxzoom is fixed when a source is added, so swap in a new one at the
+      // same position in the layer stack.
+      const layers = map.getStyle().layers;
+      const above = layers[layers.findIndex((layer) => layer.id === 'all-tracks') + 1];
+      map.removeLayer('all-tracks');
+      map.removeSource('all-tracks');
+      addAllTracks(above ? above.id : undefined);
+    }
+
+    // Ask for polyline geometry with a coarser corridor; it is expanded back
+    // to GeoJSON once per response before anything is drawn.
+    const COMPACT_GEOMETRY = { geometry_format: 'polyline', precision: 5, corridor_segments: 4 };
+
+    function decodePolyline(encoded, precision) {
+      const factor = Math.pow(10, precision);
+      const points = [];
+      let index = 0, lat = 0, lon = 0;
+      while (index < encoded.length) {
+        for (const axis of [0, 1]) {
+          // Plain arithmetic: 32-bit bit ops overflow past precision 6.
+          let scale = 1, result = 0, b;
+          do {
+            b = encoded.charCodeAt(index++) - 63;
+            result += (b % 32) * scale;
+            scale *= 32;
+          } while (b >= 0x20);
+          const delta = (result % 2) ? -(result + 1) / 2 : result / 2;
+          if (axis === 0) lat += delta; else lon += delta;
+        }
+        points.push([lon / factor, lat / factor]);
+      }
+      return points;
+    }
+
+    function expandGeometry(payload) {
+      if (!payload.geometry || payload.geometry.format !== 'polyline') return payload;
+      const precision = payload.geometry.precision;
+      for (const item of payload.top_results || []) {
+        if (item.track_polyline) {
+          item.track_geojson = { type: 'LineString', coordinates: decodePolyline(item.track_polyline, precision) };
+        }
+        if (item.corridor_polyline) {
+          item.corridor_geojson = { type: 'Polygon', coordinates: [decodePolyline(item.corridor_polyline, precision)] };
+        }
+      }
+      payload.result = (payload.top_results || [])[0];
+      return payload;
+    }
 
     function syncYearLabels() {
       startYearValue.textContent = startYear.value;
@@ -337,7 +423,8 @@ def home():
             units: selectedUnits,
             top_n: selectedTopN,
             start_year: selectedStartYear,
-            end_year: selectedEndYear
+            end_year: selectedEndYear,
+            ...COMPACT_GEOMETRY
           })
         });
         const data = await res.json();
@@ -346,7 +433,7 @@ def home():
           return;
         }
 
-        latestPayload = data;
+        latestPayload = expandGeometry(data);
         lastSearch = { type: 'address', address };
         selectedIndex = 0;
         renderShare(data.share_url);
@@ -368,13 +455,13 @@ def home():
       normalizeYearRange();
       statusEl.textContent = 'Loading shared link…';
       try {
-        const res = await fetch(`/closest-tornado-by-coords?lat=${encodeURIComponent(lat)}&lon=${encodeURIComponent(lon)}&units=${encodeURIComponent(selectedUnits)}&top_n=${encodeURIComponent(selectedTopN)}&start_year=${encodeURIComponent(selectedStartYear)}&end_year=${encodeURIComponent(selectedEndYear)}`);
+        const res = await fetch(`/closest-tornado-by-coords?lat=${encodeURIComponent(lat)}&lon=${encodeURIComponent(lon)}&units=${encodeURIComponent(selectedUnits)}&top_n=${encodeURIComponent(selectedTopN)}&start_year=${encodeURIComponent(selectedStartYear)}&end_year=${encodeURIComponent(selectedEndYear)}&${new URLSearchParams(COMPACT_GEOMETRY)}`);
         const data = await res.json();
         if (!res.ok) {
           statusEl.innerHTML = `<span class="error">${data.detail || 'Shared lookup failed'}</span>`;
           return;
         }
-        latestPayload = data;
+        latestPayload = expandGeometry(data);
         lastSearch = { type: 'coords', lat, lon };
         selectedIndex = 0;
         renderShare(data.share_url);
@@ -419,6 +506,11 @@ def home():
     });
     startYear.addEventListener('change', refreshLatestSearchIfAny);
     endYear.addEventListener('change', refreshLatestSearchIfAny);
+    startYear.addEventListener('change', refreshAllTracks);
+    endYear.addEventListener('change', refreshAllTracks);
+    allTracks.addEventListener('change', () => {
+      if (map.getLayer('all-tracks')) map.setLayoutProperty('all-tracks', 'visibility', allTracks.checked ? 'visible' : 'none');
+    });
 
     const params = new URLSearchParams(window.location.search);
     const lat = params.get('lat');
@@ -440,4 +532,17 @@ def home():
   </script>
 </body>
 </html>
-    """)
+    """
+
+# The page never changes while the process runs, so compress it once.
+_page = PrecompressedBody(
+    PAGE_HTML.replace("__TILE_MAX_ZOOM__", str(settings.tile_max_zoom))
+    .replace("__TILE_FILTERED_MAX_ZOOM__", str(settings.tile_filtered_max_zoom))
+    .encode("utf-8")
+)
+
+
+@router.get("/", response_class=HTMLResponse)
+def home(request: Request):
+    content, headers = _page.select(request.headers.get("accept-encoding"))
+    return HTMLResponse(content, headers=headers)
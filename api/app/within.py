@@ -0,0 +1,98 @@
+"""
+Every tornado within a radius of a point.
+
+Distances follow ``_serialize_row``: the edge of the estimated damage path
+(centerline distance minus half the reported width) when a width exists,
+else the centerline. ``ST_DWithin`` on ``geog_line`` prunes with the GiST
+index at ``radius + widest half-width``, so no track whose edge is inside
+the radius is missed, then the exact edge distance filters the rest.
+
+Results are ordered by ``(distance, event_id)`` and paged with a keyset
+cursor over that pair, so a page costs the same however deep it is.
+"""
+import base64
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+from sqlalchemy import text
+
+# Rows fetched per round trip when streaming through a server-side cursor.
+STREAM_BATCH_SIZE = 500
+
+WITHIN_SQL = text("""
+SELECT
+  t.event_id, t.begin_dt, t.end_dt, t.state, t.cz_name, t.wfo,
+  t.tor_f_scale, t.tor_length_miles, t.tor_width_yards,
+  h.center_m,
+  h.edge_m,
+  h.primary_m,
+  CASE WHEN :include_geometry THEN COALESCE(t.track_geojson, ST_AsGeoJSON(t.geom_line)) END AS track_geojson,
+  CASE WHEN :include_geometry THEN ST_AsGeoJSON(ST_ClosestPoint(t.geom_line, ST_SetSRID(ST_Point(:lon, :lat), 4326))) END AS closest_pt_geojson,
+  CASE WHEN :include_geometry THEN t.corridor_geojson END AS corridor_geojson
+FROM (
+  SELECT e.event_id, e.center_m, e.edge_m, COALESCE(e.edge_m, e.center_m) AS primary_m
+  FROM (
+    SELECT
+      t.event_id,
+      d.center_m,
+      CASE
+        WHEN t.tor_width_yards IS NULL THEN NULL
+        ELSE GREATEST(0, d.center_m - ((t.tor_width_yards * 0.9144) / 2.0))
+      END AS edge_m
+    FROM tornado_event t
+    CROSS JOIN LATERAL (
+      SELECT ST_Distance(t.geog_line, CAST(ST_SetSRID(ST_Point(:lon, :lat), 4326) AS geography)) AS center_m
+    ) d
+    WHERE ST_DWithin(
+        t.geog_line,
+        CAST(ST_SetSRID(ST_Point(:lon, :lat), 4326) AS geography),
+        :radius_m + (SELECT COALESCE(MAX(tor_width_yards) * 0.9144 / 2.0, 0) FROM tornado_event)
+      )
+      AND t.begin_year BETWEEN CAST(:start_year AS integer) AND CAST(:end_year AS integer)
+  ) e
+  WHERE COALESCE(e.edge_m, e.center_m) <= :radius_m
+    AND (COALESCE(e.edge_m, e.center_m), e.event_id) > (CAST(:after_m AS double precision), CAST(:after_id AS bigint))
+) h
+JOIN tornado_event t ON t.event_id = h.event_id
+ORDER BY h.primary_m ASC, h.event_id ASC
+LIMIT :limit;
+""")
+
+
+def encode_cursor(primary_m: float, event_id: int) -> str:
+    raw = orjson.dumps([float(primary_m), int(event_id)])
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """Inverse of ``encode_cursor``; raises ValueError on anything else."""
+    try:
+        primary_m, event_id = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(primary_m), int(event_id)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def within_params(
+    lat: float,
+    lon: float,
+    radius_m: float,
+    start_year: int,
+    end_year: int,
+    after: Optional[Tuple[float, int]] = None,
+    limit: Optional[int] = None,
+    include_geometry: bool = False,
+) -> Dict[str, Any]:
+    """``limit=None`` returns every remaining row (for streaming)."""
+    after_m, after_id = after if after is not None else (-1.0, 0)
+    return {
+        "lat": lat,
+        "lon": lon,
+        "radius_m": radius_m,
+        "start_year": start_year,
+        "end_year": end_year,
+        "after_m": after_m,
+        "after_id": after_id,
+        "limit": limit,
+        "include_geometry": include_geometry,
+    }
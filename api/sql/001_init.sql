@@ -1,4 +1,5 @@
 CREATE EXTENSION IF NOT EXISTS postgis;
+CREATE EXTENSION IF NOT EXISTS btree_gist;
 
 CREATE TABLE IF NOT EXISTS tornado_event (
   event_id BIGINT PRIMARY KEY,
@@ -15,9 +16,23 @@ CREATE TABLE IF NOT EXISTS tornado_event (
   end_lat DOUBLE PRECISION NULL,
   end_lon DOUBLE PRECISION NULL,
   geom_line geometry(LineString, 4326) NULL,
-  geog_line geography(LineString) NULL
+  geog_line geography(LineString) NULL,
+  begin_year INTEGER GENERATED ALWAYS AS (EXTRACT(YEAR FROM begin_dt)::integer) STORED,
+  track_geojson TEXT NULL,
+  corridor_geojson TEXT NULL
 );
 
+-- Databases created before begin_year existed.
+ALTER TABLE tornado_event
+  ADD COLUMN IF NOT EXISTS begin_year INTEGER
+  GENERATED ALWAYS AS (EXTRACT(YEAR FROM begin_dt)::integer) STORED;
+
+-- Track/corridor output materialized at import time (see import_noaa_year.py).
+ALTER TABLE tornado_event ADD COLUMN IF NOT EXISTS track_geojson TEXT NULL;
+ALTER TABLE tornado_event ADD COLUMN IF NOT EXISTS corridor_geojson TEXT NULL;
+-- No query read the materialized corridor geography; only its GeoJSON is served.
+ALTER TABLE tornado_event DROP COLUMN IF EXISTS corridor_geog;
+
 CREATE TABLE IF NOT EXISTS noaa_details_version (
   year INTEGER PRIMARY KEY,
   filename TEXT NOT NULL,
@@ -34,6 +49,67 @@ CREATE TABLE IF NOT EXISTS dataset_refresh_meta (
   updated_at TIMESTAMP NOT NULL DEFAULT NOW()
 );
 
+CREATE TABLE IF NOT EXISTS address_job (
+  job_id TEXT PRIMARY KEY,
+  status TEXT NOT NULL,
+  options JSONB NOT NULL,
+  total_rows INTEGER NOT NULL DEFAULT 0,
+  processed_rows INTEGER NOT NULL DEFAULT 0,
+  failed_rows INTEGER NOT NULL DEFAULT 0,
+  error TEXT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  started_at TIMESTAMP NULL,
+  finished_at TIMESTAMP NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Dataset summary for /meta, maintained by imports (see refresh_dataset_stats
+-- in import_noaa_year.py) so /meta never aggregates tornado_event.
+ALTER TABLE dataset_refresh_meta ADD COLUMN IF NOT EXISTS tornado_event_count BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE dataset_refresh_meta ADD COLUMN IF NOT EXISTS min_begin_dt TIMESTAMP NULL;
+ALTER TABLE dataset_refresh_meta ADD COLUMN IF NOT EXISTS max_begin_dt TIMESTAMP NULL;
+ALTER TABLE dataset_refresh_meta ADD COLUMN IF NOT EXISTS year_counts JSONB NULL;
+ALTER TABLE dataset_refresh_meta ADD COLUMN IF NOT EXISTS state_counts JSONB NULL;
+
+CREATE TABLE IF NOT EXISTS dataset_year_stats (
+  year INTEGER PRIMARY KEY,
+  event_count INTEGER NOT NULL,
+  min_begin_dt TIMESTAMP NULL,
+  max_begin_dt TIMESTAMP NULL
+);
+
+CREATE TABLE IF NOT EXISTS dataset_state_stats (
+  year INTEGER NOT NULL,
+  state TEXT NOT NULL,
+  event_count INTEGER NOT NULL,
+  PRIMARY KEY (year, state)
+);
+
+-- Unfiltered low-zoom vector tiles (see tiles.py), one set per dataset_version.
+CREATE TABLE IF NOT EXISTS map_tile (
+  dataset_version TEXT NOT NULL,
+  z SMALLINT NOT NULL,
+  x INTEGER NOT NULL,
+  y INTEGER NOT NULL,
+  tile BYTEA NOT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (dataset_version, z, x, y)
+);
+
+-- Touchdown counts per 0.1 degree cell (floor(begin_lat * 10), floor(begin_lon * 10)),
+-- year and F/EF rating (-1 unrated), maintained by imports for /density.
+CREATE TABLE IF NOT EXISTS density_cell (
+  cell_lat INTEGER NOT NULL,
+  cell_lon INTEGER NOT NULL,
+  year INTEGER NOT NULL,
+  f_rating SMALLINT NOT NULL,
+  event_count INTEGER NOT NULL,
+  PRIMARY KEY (cell_lat, cell_lon, year, f_rating)
+);
+
+CREATE INDEX IF NOT EXISTS density_cell_year
+  ON density_cell (year);
+
 INSERT INTO dataset_refresh_meta (id, data_last_refreshed, dataset_version)
 VALUES (1, NULL, NULL)
 ON CONFLICT (id) DO NOTHING;
@@ -44,3 +120,85 @@ CREATE INDEX IF NOT EXISTS tornado_event_geog_gist
 
 CREATE INDEX IF NOT EXISTS tornado_event_begin_dt
   ON tornado_event (begin_dt);
+
+-- Year-first composite GiST (btree_gist) so KNN scans over a narrow year
+-- window prune by year inside the index instead of filtering afterwards.
+-- The plain geog_line index still serves wide windows.
+CREATE INDEX IF NOT EXISTS tornado_event_year_geog_gist
+  ON tornado_event
+  USING GIST (begin_year, geog_line);
+
+-- Bounding-box lookups for vector tiles.
+CREATE INDEX IF NOT EXISTS tornado_event_geom_gist
+  ON tornado_event
+  USING GIST (geom_line);
+
+-- Lets the nearest-track search read the widest half-width without a scan.
+CREATE INDEX IF NOT EXISTS tornado_event_width
+  ON tornado_event (tor_width_yards);
+
+-- Rows still waiting for materialized GeoJSON; stays empty once imports catch up.
+CREATE INDEX IF NOT EXISTS tornado_event_unmaterialized
+  ON tornado_event (event_id)
+  WHERE track_geojson IS NULL AND geom_line IS NOT NULL;
+
+-- Backfill rows written before materialization existed or by other loaders.
+-- Keep in sync with MATERIALIZE_GEOMETRY_SQL in import_noaa_year.py.
+UPDATE tornado_event
+SET track_geojson = ST_AsGeoJSON(geom_line),
+    corridor_geojson = CASE
+      WHEN tor_width_yards IS NULL THEN NULL
+      ELSE ST_AsGeoJSON(ST_Buffer(geog_line, (tor_width_yards * 0.9144) / 2.0, 'endcap=round join=round')::geometry)
+    END
+WHERE track_geojson IS NULL
+  AND geom_line IS NOT NULL;
+
+-- One-time stats backfill for databases loaded before the summary existed
+-- (year_counts is NULL until the first summary roll-up).
+-- Keep in sync with refresh_dataset_stats in import_noaa_year.py.
+INSERT INTO dataset_year_stats (year, event_count, min_begin_dt, max_begin_dt)
+SELECT begin_year, COUNT(*), MIN(begin_dt), MAX(begin_dt)
+FROM tornado_event
+WHERE begin_year IS NOT NULL
+  AND (SELECT year_counts IS NULL FROM dataset_refresh_meta WHERE id = 1)
+GROUP BY begin_year
+ON CONFLICT (year) DO NOTHING;
+
+INSERT INTO dataset_state_stats (year, state, event_count)
+SELECT begin_year, COALESCE(state, 'UNKNOWN'), COUNT(*)
+FROM tornado_event
+WHERE begin_year IS NOT NULL
+  AND (SELECT year_counts IS NULL FROM dataset_refresh_meta WHERE id = 1)
+GROUP BY begin_year, COALESCE(state, 'UNKNOWN')
+ON CONFLICT (year, state) DO NOTHING;
+
+UPDATE dataset_refresh_meta m
+SET tornado_event_count = s.total + (SELECT COUNT(*) FROM tornado_event WHERE begin_dt IS NULL),
+    min_begin_dt = s.min_begin_dt,
+    max_begin_dt = s.max_begin_dt,
+    year_counts = COALESCE((SELECT jsonb_object_agg(year, event_count) FROM dataset_year_stats), '{}'::jsonb),
+    state_counts = COALESCE((
+      SELECT jsonb_object_agg(state, n)
+      FROM (SELECT state, SUM(event_count) AS n FROM dataset_state_stats GROUP BY state) x
+    ), '{}'::jsonb)
+FROM (
+  SELECT COALESCE(SUM(event_count), 0) AS total, MIN(min_begin_dt) AS min_begin_dt, MAX(max_begin_dt) AS max_begin_dt
+  FROM dataset_year_stats
+) s
+WHERE m.id = 1
+  AND m.year_counts IS NULL;
+
+-- One-time density backfill for databases loaded before density_cell existed.
+-- Keep in sync with INSERT_DENSITY_SQL in import_noaa_year.py.
+INSERT INTO density_cell (cell_lat, cell_lon, year, f_rating, event_count)
+SELECT
+  CAST(floor(begin_lat * 10) AS integer),
+  CAST(floor(begin_lon * 10) AS integer),
+  begin_year,
+  COALESCE(CAST(substring(tor_f_scale FROM '[0-9]') AS smallint), -1),
+  COUNT(*)
+FROM tornado_event
+WHERE begin_year IS NOT NULL
+  AND begin_lat IS NOT NULL AND begin_lon IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM density_cell)
+GROUP BY 1, 2, 3, 4;
@@ -0,0 +1,44 @@
+"""
+Throughput of per-point lookups vs the set-based batch query.
+
+    DATABASE_URL=... python -m benchmarks.bench_batch --sizes 1000 10000
+
+"single" calls ``_query_top_rows`` once per point (what a client looping
+over /closest-tornado-by-coords costs the database); "batch" answers the
+same points through ``_query_top_rows_batch``.
+"""
+import argparse
+import random
+import time
+
+from api.app import main
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-point and batch nearest-tornado throughput.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--skip-single-above", type=int, default=2000, help="only time the per-point loop up to this many points")
+    args = parser.parse_args()
+
+    main.track_index = None
+    rnd = random.Random(3)
+    for size in args.sizes:
+        points = [(rnd.uniform(25, 49), rnd.uniform(-125, -67)) for _ in range(size)]
+
+        if size <= args.skip_single_above:
+            start = time.perf_counter()
+            for lat, lon in points:
+                main._query_top_rows(lat, lon, limit=args.top_n)
+            elapsed = time.perf_counter() - start
+            print(f"single n={size:<6} {elapsed:8.2f} s  {size / elapsed:9.1f} points/s")
+
+        start = time.perf_counter()
+        results = main._query_top_rows_batch(points, limit=args.top_n)
+        elapsed = time.perf_counter() - start
+        rounds = max(r.stats.get("rounds", 1) for r in results)
+        print(f"batch  n={size:<6} {elapsed:8.2f} s  {size / elapsed:9.1f} points/s  rounds={rounds}")
+
+
+if __name__ == "__main__":
+    main_cli()
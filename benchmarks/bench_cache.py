@@ -0,0 +1,80 @@
+"""
+Result cache get/set throughput: the current LRU ``TTLCache`` against the
+previous dict cache whose full-cache ``set`` scanned every entry.
+
+    python -m benchmarks.bench_cache --ops 200000 --max-items 5000
+
+Keys are drawn from a Zipf-like distribution over 4x ``max_items`` distinct
+keys, 80% reads / 20% writes, with every miss followed by a set.
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from api.app.guardrails import TTLCache
+
+
+class LegacyTTLCache:
+    """The cache as it was before the LRU rewrite."""
+    def __init__(self, ttl_seconds: int = 6 * 3600, max_items: int = 5000):
+        self.ttl = ttl_seconds
+        self.max_items = max_items
+        self._store: Dict[Tuple[Any, ...], Tuple[float, Any]] = {}
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[Any]:
+        now = time.time()
+        item = self._store.get(key)
+        if not item:
+            return None
+        expires_at, value = item
+        if now >= expires_at:
+            self._store.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: Tuple[Any, ...], value: Any) -> None:
+        now = time.time()
+        if len(self._store) >= self.max_items:
+            oldest_key = min(self._store.items(), key=lambda kv: kv[1][0])[0]
+            self._store.pop(oldest_key, None)
+        self._store[key] = (now + self.ttl, value)
+
+
+def workload(ops: int, distinct: int, seed: int = 3) -> list[tuple[bool, tuple]]:
+    rnd = random.Random(seed)
+    weights = [1.0 / (i + 1) for i in range(distinct)]
+    keys = rnd.choices(range(distinct), weights=weights, k=ops)
+    return [(rnd.random() < 0.8, ("closest_coords_v4", "20240105", k, "miles", 5, 1950, 2026)) for k in keys]
+
+
+def run(cache, ops, value) -> tuple[float, float]:
+    hits = 0
+    start = time.perf_counter()
+    for is_read, key in ops:
+        if is_read and cache.get(key) is not None:
+            hits += 1
+            continue
+        cache.set(key, value)
+    elapsed = time.perf_counter() - start
+    return elapsed, hits / sum(1 for is_read, _ in ops if is_read)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Compare result cache implementations.")
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--max-items", type=int, default=5000)
+    args = parser.parse_args()
+
+    ops = workload(args.ops, args.max_items * 4)
+    value = {"result": {"event_id": 1, "selected_distance": 1.23}, "top_results": []}
+    for label, cache in [
+        ("legacy", LegacyTTLCache(max_items=args.max_items)),
+        ("lru", TTLCache(max_items=args.max_items)),
+    ]:
+        elapsed, hit_rate = run(cache, ops, value)
+        print(f"{label:<7} {args.ops / elapsed:12,.0f} ops/s  {elapsed * 1e6 / args.ops:8.2f} us/op  read hit rate={hit_rate:.3f}")
+
+
+if __name__ == "__main__":
+    main_cli()
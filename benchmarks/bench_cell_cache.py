@@ -0,0 +1,71 @@
+"""
+Grid-cell candidate cache on metro-clustered traffic.
+
+    DATABASE_URL=... python -m benchmarks.bench_cell_cache --requests 2000
+
+Draws lookups around a few metro centres (Gaussian, ~5 km sigma) and runs
+them through ``_query_top_rows`` with and without the cell cache. The result
+cache is not involved: these points almost never repeat at 4-decimal
+rounding, which is the traffic the cell tier is for.
+"""
+import argparse
+import random
+import statistics
+import time
+from unittest.mock import patch
+
+from api.app import main
+from api.app.cell_cache import CellCache
+
+METROS = [(35.4676, -97.5164), (36.1540, -95.9928), (32.7767, -96.7970), (39.0997, -94.5786), (33.5207, -86.8025)]
+
+
+def points(n: int, seed: int = 9) -> list[tuple[float, float]]:
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        lat, lon = rnd.choice(METROS)
+        out.append((rnd.gauss(lat, 0.045), rnd.gauss(lon, 0.055)))
+    return out
+
+
+def run(pts, top_n, end_year) -> list[float]:
+    timings = []
+    for lat, lon in pts:
+        start = time.perf_counter()
+        main._query_top_rows(lat, lon, limit=top_n, end_year=end_year)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return timings
+
+
+def summarize(label, timings):
+    timings = sorted(timings)
+    p50 = timings[len(timings) // 2]
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<10} mean={statistics.fmean(timings):8.2f} ms  p50={p50:8.2f} ms  p95={p95:8.2f} ms")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Measure the grid-cell candidate cache.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--cell-deg", type=float, default=0.02)
+    args = parser.parse_args()
+
+    pts = points(args.requests)
+    end_year = main._current_year()
+    main.track_index = None
+
+    with patch.object(main, "cell_cache", None):
+        run(pts[:20], args.top_n, end_year)
+        summarize("postgis", run(pts, args.top_n, end_year))
+
+    cells = CellCache(cell_deg=args.cell_deg)
+    with patch.object(main, "cell_cache", cells):
+        summarize("cells", run(pts, args.top_n, end_year))
+    stats = cells.stats()
+    print(f"cell hit rate={stats['hit_rate']}  cells={stats['items']}  bytes={stats['bytes']}  uncacheable={stats['uncacheable_fills']}")
+
+
+if __name__ == "__main__":
+    main_cli()
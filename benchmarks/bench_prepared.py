@@ -0,0 +1,72 @@
+"""
+Unprepared vs server-side prepared nearest-tornado query.
+
+    DATABASE_URL=... python -m benchmarks.bench_prepared --points 500
+
+Runs ``_query_top_rows`` through two single-connection engines, one with
+``prepare_threshold=None`` (parse + plan on every call) and one with
+``prepare_threshold=0`` (prepared on first use). A sampled EXPLAIN ANALYZE
+of the same points reports how much of each call is planning.
+"""
+import argparse
+import random
+import statistics
+import time
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+
+from api.app import main
+from api.app.instrumentation import query_timings
+from api.app.settings import settings
+
+
+def summarize(label, timings):
+    timings = sorted(timings)
+    p50 = timings[len(timings) // 2]
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<10} mean={statistics.fmean(timings):8.2f} ms  p50={p50:8.2f} ms  p95={p95:8.2f} ms")
+
+
+def run(engine, points, top_n, end_year) -> list[float]:
+    timings = []
+    with patch.object(main, "engine", engine):
+        for lat, lon in points:
+            start = time.perf_counter()
+            main._query_top_rows(lat, lon, limit=top_n, end_year=end_year)
+            timings.append((time.perf_counter() - start) * 1000.0)
+    return timings
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Compare unprepared and prepared nearest-tornado SQL.")
+    parser.add_argument("--points", type=int, default=500)
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--plan-cache-mode", default=settings.db_plan_cache_mode)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    points = [(rnd.uniform(25, 49), rnd.uniform(-125, -67)) for _ in range(args.points)]
+    end_year = main._current_year()
+    main.track_index = None
+
+    options = f"-c plan_cache_mode={args.plan_cache_mode}"
+    unprepared = create_engine(settings.database_url, pool_size=1, connect_args={"prepare_threshold": None, "options": options})
+    prepared = create_engine(settings.database_url, pool_size=1, connect_args={"prepare_threshold": 0, "options": options})
+
+    # Warm the buffer cache (and the prepared statement) before timing.
+    run(unprepared, points[:20], args.top_n, end_year)
+    run(prepared, points[:20], args.top_n, end_year)
+
+    summarize("unprepared", run(unprepared, points, args.top_n, end_year))
+    summarize("prepared", run(prepared, points, args.top_n, end_year))
+
+    query_timings.reset()
+    with patch.object(settings, "query_explain_sample_rate", 1.0):
+        run(unprepared, points[:100], args.top_n, end_year)
+    stats = query_timings.snapshot()["nearest"]
+    print(f"EXPLAIN ANALYZE (unprepared): planning={stats['mean_planning_ms']} ms  execution={stats['mean_execution_ms']} ms")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,110 @@
+"""
+Before/after timing for the nearest-tornado SQL.
+
+    DATABASE_URL=... python -m benchmarks.bench_two_phase --points 300
+
+"before" is the original single-phase query (GeoJSON, closest point and
+ST_Buffer corridor for all 250 KNN candidates); "after" is the current
+two-phase ``_query_top_rows``. Run it against a full 1950-present load.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from api.app import main
+
+LEGACY_SQL = text("""
+WITH user_pt AS (
+  SELECT
+    ST_SetSRID(ST_Point(:lon, :lat), 4326) AS geom,
+    ST_SetSRID(ST_Point(:lon, :lat), 4326)::geography AS geog
+),
+candidates AS (
+  SELECT
+    t.*,
+    ST_Distance((SELECT geog FROM user_pt), t.geog_line) AS center_m,
+    CASE
+      WHEN t.tor_width_yards IS NULL THEN NULL
+      ELSE GREATEST(
+        0,
+        ST_Distance((SELECT geog FROM user_pt), t.geog_line) - ((t.tor_width_yards * 0.9144) / 2.0)
+      )
+    END AS edge_m,
+    ST_AsGeoJSON(t.geom_line) AS track_geojson,
+    ST_AsGeoJSON(ST_ClosestPoint(t.geom_line, (SELECT geom FROM user_pt))) AS closest_pt_geojson,
+    CASE
+      WHEN t.tor_width_yards IS NULL THEN NULL
+      ELSE ST_AsGeoJSON(
+        ST_Buffer(
+          t.geog_line,
+          (t.tor_width_yards * 0.9144) / 2.0,
+          'endcap=round join=round'
+        )::geometry
+      )
+    END AS corridor_geojson
+  FROM tornado_event t
+  WHERE t.begin_dt IS NOT NULL
+    AND EXTRACT(YEAR FROM t.begin_dt) BETWEEN :start_year AND :end_year
+  ORDER BY t.geog_line <-> (SELECT geog FROM user_pt)
+  LIMIT 250
+),
+ranked AS (
+  SELECT *,
+    COALESCE(edge_m, center_m) AS primary_m
+  FROM candidates
+)
+SELECT *
+FROM ranked
+ORDER BY primary_m ASC
+LIMIT :limit;
+""")
+
+
+def run_legacy(lat, lon, limit, end_year):
+    with main.engine.begin() as conn:
+        return conn.execute(LEGACY_SQL, {"lat": lat, "lon": lon, "limit": limit, "start_year": 1950, "end_year": end_year}).mappings().all()
+
+
+def summarize(label, timings):
+    timings = sorted(timings)
+    p50 = timings[len(timings) // 2]
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<8} mean={statistics.fmean(timings):8.2f} ms  p50={p50:8.2f} ms  p95={p95:8.2f} ms")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Compare single-phase and two-phase nearest-tornado SQL.")
+    parser.add_argument("--points", type=int, default=300)
+    parser.add_argument("--top-n", type=int, default=15)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    points = [(rnd.uniform(25, 49), rnd.uniform(-125, -67)) for _ in range(args.points)]
+    end_year = main._current_year()
+    main.track_index = None
+
+    # Warm the buffer cache so the first variant is not penalized.
+    for lat, lon in points[:20]:
+        run_legacy(lat, lon, args.top_n, end_year)
+
+    before, after, examined = [], [], []
+    for lat, lon in points:
+        start = time.perf_counter()
+        run_legacy(lat, lon, args.top_n, end_year)
+        before.append((time.perf_counter() - start) * 1000.0)
+
+        start = time.perf_counter()
+        rows = main._query_top_rows(lat, lon, limit=args.top_n, end_year=end_year)
+        after.append((time.perf_counter() - start) * 1000.0)
+        examined.append(rows.stats.get("rows_examined", 0))
+
+    summarize("before", before)
+    summarize("after", after)
+    print(f"rows examined after: mean={statistics.fmean(examined):.1f} max={max(examined)} (before: 250)")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,50 @@
+"""
+Nearest-tornado latency across year-window widths.
+
+    DATABASE_URL=... python -m benchmarks.bench_year_windows --points 200
+
+Each window ends at --end-year (default 2011). With the year-aware GiST index
+a one-year window should cost about the same as the full range.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from api.app import main
+
+WIDTHS = [1, 2, 5, 10, 25, None]
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Time _query_top_rows for several year-window widths.")
+    parser.add_argument("--points", type=int, default=200)
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--end-year", type=int, default=2011)
+    args = parser.parse_args()
+
+    rnd = random.Random(11)
+    points = [(rnd.uniform(25, 49), rnd.uniform(-125, -67)) for _ in range(args.points)]
+    main.track_index = None
+
+    for lat, lon in points[:20]:
+        main._query_top_rows(lat, lon, limit=args.top_n)
+
+    for width in WIDTHS:
+        start_year = 1950 if width is None else args.end_year - width + 1
+        timings, examined = [], []
+        for lat, lon in points:
+            start = time.perf_counter()
+            rows = main._query_top_rows(lat, lon, limit=args.top_n, start_year=start_year, end_year=args.end_year)
+            timings.append((time.perf_counter() - start) * 1000.0)
+            examined.append(rows.stats.get("rows_examined", 0))
+        timings.sort()
+        label = f"{start_year}-{args.end_year}"
+        print(
+            f"{label:<10} mean={statistics.fmean(timings):8.2f} ms  p50={timings[len(timings) // 2]:8.2f} ms  "
+            f"p95={timings[int(len(timings) * 0.95) - 1]:8.2f} ms  rows_examined={statistics.fmean(examined):.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -19,6 +19,53 @@ class GuardrailTests(unittest.TestCase):
         time.sleep(1.1)
         self.assertIsNone(cache.get(key))
 
+    def test_ttl_cache_evicts_least_recently_used(self):
+        cache = TTLCache(ttl_seconds=60, max_items=2)
+        cache.set(("a",), 1)
+        cache.set(("b",), 2)
+        cache.get(("a",))
+        cache.set(("c",), 3)
+        self.assertEqual(cache.get(("a",)), 1)
+        self.assertIsNone(cache.get(("b",)))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_cache_byte_budget(self):
+        cache = TTLCache(ttl_seconds=60, max_items=100, max_bytes=1000)
+        for i in range(5):
+            cache.set(("k", i), "x" * 300)
+        stats = cache.stats()
+        self.assertEqual(stats["items"], 3)
+        self.assertEqual(stats["bytes"], 900)
+        self.assertIsNone(cache.get(("k", 0)))
+
+        cache.set(("big",), "x" * 2000)
+        self.assertIsNone(cache.get(("big",)))
+        self.assertEqual(cache.stats()["bytes"], 900)
+
+    def test_ttl_cache_replacing_a_key_keeps_byte_count(self):
+        cache = TTLCache(ttl_seconds=60, max_items=10)
+        cache.set(("a",), "x" * 10)
+        cache.set(("a",), "x" * 20)
+        self.assertEqual(cache.stats()["bytes"], 20)
+        cache.clear()
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def test_ttl_cache_periodic_sweep_drops_expired_entries(self):
+        cache = TTLCache(ttl_seconds=1, max_items=10, sweep_seconds=0)
+        cache.set(("a",), 1)
+        time.sleep(1.1)
+        cache.set(("b",), 2)
+        stats = cache.stats()
+        self.assertEqual((stats["items"], stats["expirations"]), (1, 1))
+
+    def test_ttl_cache_hit_miss_counters(self):
+        cache = TTLCache(ttl_seconds=60, max_items=10)
+        cache.set(("a",), 1)
+        cache.get(("a",))
+        cache.get(("b",))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
 
 if __name__ == "__main__":
     unittest.main()